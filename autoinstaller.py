@@ -1,22 +1,44 @@
 #!/usr/bin/python3
 
+import argparse
 import asyncio
+import atexit
+import base64
+import collections
 from concurrent.futures import ThreadPoolExecutor
+import contextlib
+from datetime import datetime, timezone
+import gzip
+import hashlib
 import importlib
+import importlib.metadata
+import importlib.util
+import itertools
 import json
 import os
+import queue
+import re
+import resource
+import shutil
+import threading
 import typing
 from pathlib import Path
 import socket
 import socketserver
+import sys
 import time
+import zipfile
+import zlib
 
 import aiofiles
 import aiohttp
 from aiohttp import web
 import asyncssh
+from cryptography import x509
+from cryptography.x509.oid import NameOID
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 
 executor = ThreadPoolExecutor(max_workers=5)
 
@@ -26,11 +48,251 @@ except ModuleNotFoundError:
     cc = None
 
 
+class Metrics:
+    """Session counters and histograms in Prometheus text format, plus events for the progress stream."""
+
+    buckets = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300)
+    descriptions = {
+        "serial_operations_total": "cc3200tool operations by result",
+        "serial_operation_seconds": "Duration of cc3200tool operations",
+        "ssh_commands_total": "Shell commands run on clients",
+        "ssh_command_seconds": "Duration of shell commands run on clients",
+        "rpc_calls_total": "RPC calls to client agents by operation",
+        "rpc_call_seconds": "Duration of RPC calls to client agents",
+        "bytes_transferred_total": "Bytes sent to or received from clients",
+        "phase_seconds": "Duration of installation phases",
+        "client_startup_seconds": "Time from the install script start to the first client broadcast",
+        "link_bytes_per_second": "Measured bandwidth of the target's internet and lan links",
+        "target_cpu_percent": "CPU usage of the target",
+        "target_iowait_percent": "CPU time of the target waiting for I/O",
+        "target_memory_used_megabytes": "Used memory of the target",
+        "target_disk_bytes_per_second": "Disk throughput of the target",
+        "target_network_bytes_per_second": "Network throughput of the target",
+        "processes_total": "Local processes by program and result",
+        "process_wall_seconds": "Wall time of local processes",
+        "process_cpu_seconds_total": "CPU time of local processes that ran alone, concurrent ones are not counted",
+    }
+
+    counters: dict[str, dict[tuple, float]] = {}
+    gauges: dict[str, dict[tuple, float]] = {}
+    histograms: dict[str, dict[tuple, list[float]]] = {}
+    subscribers: set[asyncio.Queue] = set()
+    phases: list[str] = []
+
+    @staticmethod
+    def inc(name: str, value: float = 1, **labels):
+        series = Metrics.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    @staticmethod
+    def set(name: str, value: float, **labels):
+        Metrics.gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    @staticmethod
+    def observe(name: str, value: float, **labels):
+        series = Metrics.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        # bucket counts, followed by sum and count
+        values = series.setdefault(key, [0] * (len(Metrics.buckets) + 2))
+
+        for i, bound in enumerate(Metrics.buckets):
+            if value <= bound:
+                values[i] += 1
+
+        values[-2] += value
+        values[-1] += 1
+
+    @staticmethod
+    @contextlib.contextmanager
+    def phase(name: str):
+        Metrics.phases.append(name)
+        Metrics.publish({"event": "phase_start", "phase": name})
+        start = time.perf_counter()
+        result = "error"
+
+        try:
+            yield
+            result = "ok"
+
+        finally:
+            duration = time.perf_counter() - start
+            Metrics.phases.remove(name)
+            Metrics.observe("phase_seconds", duration, phase=name)
+            Metrics.publish({"event": "phase_end", "phase": name, "result": result, "seconds": round(duration, 3)})
+
+    @staticmethod
+    def publish(event: dict):
+        if not Metrics.subscribers:
+            return
+
+        event = {"time": time.time(), **event}
+        try:
+            asyncio.get_running_loop()
+
+        except RuntimeError:
+            # called from an executor thread, for example by cc3200tool
+            loop.call_soon_threadsafe(Metrics._deliver, event)
+
+        else:
+            Metrics._deliver(event)
+
+    @staticmethod
+    def _deliver(event: dict):
+        for subscriber in Metrics.subscribers:
+            if not subscriber.full():
+                subscriber.put_nowait(event)
+
+    @staticmethod
+    def render() -> str:
+        def labels(key: tuple, **extra) -> str:
+            items = [*key, *extra.items()]
+            if not items:
+                return ""
+
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        for name, series in Metrics.counters.items():
+            lines.append(f"# HELP {name} {Metrics.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{labels(key)} {value}" for key, value in series.items())
+
+        for name, series in Metrics.gauges.items():
+            lines.append(f"# HELP {name} {Metrics.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{labels(key)} {value}" for key, value in series.items())
+
+        for name, series in Metrics.histograms.items():
+            lines.append(f"# HELP {name} {Metrics.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, values in series.items():
+                for bound, count in zip(Metrics.buckets, values):
+                    lines.append(f"{name}_bucket{labels(key, le=bound)} {count}")
+
+                lines.append(f"{name}_bucket{labels(key, le='+Inf')} {values[-1]}")
+                lines.append(f"{name}_sum{labels(key)} {values[-2]}")
+                lines.append(f"{name}_count{labels(key)} {values[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+
 class ConsoleLogger(Console):
+    """
+    Log messages are queued and rendered by a worker thread, repeated messages are coalesced.
+    Full output per host or device is kept in bounded buffers, which can be dumped on failure.
+    """
+
     DEBUG = False
+    coalesce_window = 0.5
+    progress_interval = 0.25
+    max_backlog = 5000
+    buffer_size = 2000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._buffers: dict[str, collections.deque] = {}
+        self._progress: dict[str, float] = {}
+        self._dropped = 0
+
+        self._worker = threading.Thread(target=self._render, name="console", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def _render(self):
+        last = None
+        repeats = 0
+
+        while True:
+            try:
+                item = self._queue.get(timeout=ConsoleLogger.coalesce_window)
+
+            except queue.Empty:
+                item = False
+
+            if repeats and (not item or item[0] != "log" or item[1] != last):
+                Console.log(self, f"[grey50]... repeated {repeats} more time{'s' if repeats > 1 else ''}[/grey50]")
+                repeats = 0
+                last = None
+
+            if item is None:
+                return
+
+            if item is False:
+                continue
+
+            kind, objects, kwargs = item
+            if kind == "flush":
+                objects.set()
+                continue
+
+            if objects == last:
+                repeats += 1
+                continue
+
+            last = objects
+            if self._dropped:
+                Console.log(self, f"[grey50]... dropped {self._dropped} debug messages[/grey50]")
+                self._dropped = 0
+
+            try:
+                Console.log(self, *objects, **kwargs)
+
+            except Exception as e:
+                Console.print(self, f"Failed to render log message {objects!r}: {e}", markup=False)
+
+    def log(self, *objects, **kwargs):
+        self._queue.put(("log", objects, kwargs))
+
+    def flush(self):
+        if not self._worker.is_alive():
+            return
+
+        done = threading.Event()
+        self._queue.put(("flush", done, None))
+        done.wait()
+
+    def close(self):
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+
+    def progress(self, key: str, text: str, final: bool = False):
+        """Logs a progress line for `key`, skipping updates that come faster than `progress_interval`."""
+        now = time.monotonic()
+        if not final and now - self._progress.get(key, 0) < ConsoleLogger.progress_interval:
+            return
+
+        self._progress[key] = now
+        self.info(text)
+
+    def capture(self, source: str, text: str):
+        """Keeps `text` in the bounded output buffer of `source` without rendering it."""
+        buffer = self._buffers.setdefault(source, collections.deque(maxlen=ConsoleLogger.buffer_size))
+        stamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        buffer.extend(f"{stamp} {line}" for line in text.splitlines() or [""])
+
+    def dump_capture(self, source: str) -> typing.Optional[str]:
+        buffer = self._buffers.get(source)
+        if not buffer:
+            return None
+
+        folder = "./out/logs/"
+        os.makedirs(folder, exist_ok=True)
+        path = f"{folder}{source.strip('/').replace('/', '_').replace(':', '_')}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.log"
+        with open(path, "w") as f:
+            f.write("\n".join(buffer) + "\n")
+
+        self.info(f"Wrote output of {source} to `{path}`")
+        return path
 
     def debug(self, text: str, *form):
         if ConsoleLogger.DEBUG:
+            if self._queue.qsize() > ConsoleLogger.max_backlog:
+                self._dropped += 1
+                return
+
             if form:
                 text %= form
             self.log(f"[grey66]{text}[/grey66]")
@@ -39,11 +301,13 @@ class ConsoleLogger(Console):
         if form:
             text %= form
         self.log(f"[grey82]{text}[/grey82]")
+        Metrics.publish({"event": "log", "level": "info", "message": text})
 
     def warning(self, text: str, *form):
         if form:
             text %= form
         self.log(f"[yellow1][bold]Warning:[/bold] {text}[/yellow1]")
+        Metrics.publish({"event": "log", "level": "warning", "message": text})
 
     def warn(self, text: str, *form):
         self.warning(text, *form)
@@ -52,10 +316,45 @@ class ConsoleLogger(Console):
         if form:
             text %= form
         self.log(f"[red1][bold]Error:[/bold] {text}[/red1]")
+        Metrics.publish({"event": "log", "level": "error", "message": text})
+
+
+class SourceLogger:
+    """Logger handed to cc3200tool, keeps everything it logs in the buffer of `source`, debug output included."""
+
+    def __init__(self, logger: ConsoleLogger, source: str):
+        self._logger = logger
+        self._source = source
+
+    def __getattr__(self, name: str):
+        return getattr(self._logger, name)
+
+    def _capture(self, text: str, form: tuple) -> str:
+        if form:
+            text %= form
+        self._logger.capture(self._source, str(text))
+        return text
+
+    def debug(self, text: str, *form):
+        self._logger.debug(self._capture(text, form))
+
+    def info(self, text: str, *form):
+        self._logger.info(self._capture(text, form))
+
+    def warning(self, text: str, *form):
+        self._logger.warning(self._capture(text, form))
+
+    def warn(self, text: str, *form):
+        self.warning(text, *form)
+
+    def error(self, text: str, *form):
+        self._logger.error(self._capture(text, form))
 
 
 console = ConsoleLogger()
 broadcast_port = 37021
+teddycloud_image = "ghcr.io/toniebox-reverse-engineering/teddycloud:latest"
+compose_url = "https://raw.githubusercontent.com/toniebox-reverse-engineering/teddycloud/master/docker/docker-compose.yaml"
 
 logo = r"""[bold][white]
    _         _         _____           _   
@@ -86,6 +385,132 @@ circuit = r"""
 """
 
 
+class StdinReader:
+    """
+    Line reader driven by the event loop instead of a worker thread blocked in `input()`.
+    Pending reads can be cancelled or time out, falls back to the executor if stdin is not pollable.
+    """
+
+    lines: asyncio.Queue | None = None
+    buffer = b""
+    is_pollable = True
+
+    @staticmethod
+    def _on_readable():
+        fd = sys.stdin.fileno()
+        data = os.read(fd, 4096)
+
+        if not data:
+            loop.remove_reader(fd)
+            StdinReader.lines.put_nowait(None)
+            return
+
+        StdinReader.buffer += data
+        while b"\n" in StdinReader.buffer:
+            line, _, StdinReader.buffer = StdinReader.buffer.partition(b"\n")
+            StdinReader.lines.put_nowait(line.decode(errors="replace").rstrip("\r"))
+
+    @staticmethod
+    def _start():
+        StdinReader.lines = asyncio.Queue()
+
+        try:
+            loop.add_reader(sys.stdin.fileno(), StdinReader._on_readable)
+
+        except (NotImplementedError, PermissionError, ValueError, OSError):
+            # for example, stdin redirected from a regular file
+            StdinReader.is_pollable = False
+
+    @staticmethod
+    async def readline(timeout: typing.Optional[float] = None) -> str:
+        if StdinReader.lines is None:
+            StdinReader._start()
+
+        if not StdinReader.is_pollable:
+            return await asyncio.wait_for(loop.run_in_executor(executor, input), timeout)
+
+        line = await asyncio.wait_for(StdinReader.lines.get(), timeout)
+        if line is None:
+            # keep reporting eof to later prompts
+            StdinReader.lines.put_nowait(None)
+            raise EOFError
+
+        return line
+
+
+async def read_input(timeout: typing.Optional[float] = None) -> str:
+    # log lines still queued belong in front of the answer
+    console.flush()
+    return await StdinReader.readline(timeout)
+
+
+class ProcessResult(typing.NamedTuple):
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    wall_time: float
+    # None if other processes ran at the same time, their usage cannot be told apart
+    cpu_time: typing.Optional[float]
+
+
+process_limit = asyncio.Semaphore(4)
+# overlap flag per running process
+running_processes: list[list[bool]] = []
+
+
+async def run_process(
+        *argv: str,
+        timeout: typing.Optional[float] = 30,
+        stdin: typing.Optional[bytes] = None,
+) -> ProcessResult:
+    """Executes argv without a shell, bounded by `process_limit`, killing it after `timeout` seconds."""
+    program = os.path.basename(argv[0])
+
+    async with process_limit:
+        overlapped = [bool(running_processes)]
+        for other in running_processes:
+            other[0] = True
+        running_processes.append(overlapped)
+
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await asyncio.wait_for(proc.communicate(stdin), timeout)
+
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            Metrics.inc("processes_total", program=program, result="timeout")
+            console.debug(f"`{' '.join(argv)}` timed out after {timeout}s")
+            raise
+
+        finally:
+            running_processes.remove(overlapped)
+
+        wall_time = time.perf_counter() - start
+        # children usage is process wide, it only belongs to this process if no other one ran meanwhile
+        cpu_time = None
+        if not overlapped[0]:
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu_time = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+
+    Metrics.inc("processes_total", program=program, result="ok" if proc.returncode == 0 else "error")
+    Metrics.observe("process_wall_seconds", wall_time, program=program)
+    if cpu_time is not None:
+        Metrics.inc("process_cpu_seconds_total", cpu_time, program=program)
+    cpu = f"{cpu_time:.3f}s cpu" if cpu_time is not None else "cpu shared with other processes"
+    console.debug(f"`{' '.join(argv)}` returned {proc.returncode} in {wall_time:.3f}s ({cpu})")
+
+    return ProcessResult(proc.returncode, stdout, stderr, wall_time, cpu_time)
+
+
 def print_welcome() -> None:
     console.print("Launching autoinstaller...", style="bold steel_blue1")
     console.print(logo)
@@ -104,7 +529,10 @@ async def print_description():
 async def setup() -> str:
     can_dump = "grey42" if cc is None else "grey82"
     number_color = "grey42" if cc is None else "steel_blue1"
+    can_upload = "grey82" if ConnectionPool.hosts() else "grey42"
+    upload_color = "steel_blue1" if ConnectionPool.hosts() else "grey42"
 
+    console.flush()
     console.print(
         "[bold steel_blue1]Choose an Option to continue:[/bold steel_blue1]\n"
         f" [{can_dump}][bold]([{number_color}]1[/{number_color}])[/bold] "
@@ -117,15 +545,27 @@ async def setup() -> str:
         "Manual cloud deploy\n"
         f" [{can_dump}][bold]([{number_color}]5[/{number_color}])[/bold] "
         f"Flash cloud certificate[/{can_dump}]\n"
+        f" [{can_upload}][bold]([{upload_color}]6[/{upload_color}])[/bold] "
+        f"Upload box certificates to connected server[/{can_upload}]\n"
+        " [grey82][bold]([steel_blue1]7[/steel_blue1])[/bold] "
+        "Show certificate inventory[/grey82]\n"
+        f" [{can_upload}][bold]([{upload_color}]8[/{upload_color}])[/bold] "
+        f"Benchmark connected servers[/{can_upload}]\n"
+        " [grey82][bold]([steel_blue1]9[/steel_blue1])[/bold] "
+        "Restore certificates from backup[/grey82]\n"
+        " [grey82][bold]([steel_blue1]U[/steel_blue1])[/bold] "
+        "Rolling update of TeddyCloud servers[/grey82]\n"
         f" [{can_dump}][bold]([{number_color}]F[/{number_color}])[/bold] "
         f"Full installation helper[/{can_dump}]\n"
+        f" [{can_dump}][bold]([{number_color}]P[/{number_color}])[/bold] "
+        f"Pipelined installation for multiple boxes[/{can_dump}]\n"
         " [bold]([steel_blue1]Q[/steel_blue1])[/bold] "
         "Exit installation script[/grey82]\n\n"
         "[bold]Enter here[/bold] (default q):",
         end=" "
     )
     try:
-        user_input = await loop.run_in_executor(executor, input) or "q"
+        user_input = await read_input() or "q"
         return user_input
 
     except KeyboardInterrupt:
@@ -133,17 +573,18 @@ async def setup() -> str:
 
 
 last_usb: typing.Optional[str] = None
+last_usb_model: typing.Optional[str] = None
 
 
 async def get_usb_port() -> typing.Optional[str]:
-    global last_usb
+    global last_usb, last_usb_model
     if last_usb:
         console.print(
             f"\nPreviously selected device on `{last_usb}`\n"
             "[bold]Use that? [[green4]Y[/green4]/[red3]n[/red3]] [/bold]",
             end=""
         )
-        choice = await loop.run_in_executor(executor, input)
+        choice = await read_input()
         if choice.lower() == "y" or choice == "":
             return last_usb
 
@@ -156,15 +597,15 @@ async def get_usb_port() -> typing.Optional[str]:
         style="bold steel_blue1",
         end=" ",
     )
-    await loop.run_in_executor(executor, input)
+    await read_input()
 
     console.info("Searching for usb devices")
-    proc = await asyncio.create_subprocess_shell(
-        "lsusb",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    stdout, stderr = await proc.communicate()
+    try:
+        stdout = (await run_process("lsusb")).stdout
+
+    except (OSError, asyncio.TimeoutError) as e:
+        console.error(f"Failed to list usb devices: {e}\n")
+        return None
 
     console.print(
         "\nSelect the device in the list below",
@@ -172,6 +613,7 @@ async def get_usb_port() -> typing.Optional[str]:
     )
 
     devices = []
+    models = []
     default = None
 
     for line in stdout.decode().splitlines():
@@ -182,6 +624,7 @@ async def get_usb_port() -> typing.Optional[str]:
 
         path = f"/dev/bus/usb/{parts[1]}/{parts[3][:-1]}"
         devices.append(path)
+        models.append(f"{parts[5]} {name}")
 
         index = len(devices)
         is_default = False
@@ -200,9 +643,10 @@ async def get_usb_port() -> typing.Optional[str]:
         return None
 
     console.print(f"[bold]Enter here[/bold] (default {default}):", end=" ")
-    user_input = await loop.run_in_executor(executor, input) or default.__str__()
+    user_input = await read_input() or default.__str__()
     try:
         dev_path = devices[int(user_input) - 1]
+        model = models[int(user_input) - 1]
 
     except (IndexError, TypeError, ValueError):
         console.error(f"Invalid option: {user_input}\n")
@@ -214,53 +658,74 @@ async def get_usb_port() -> typing.Optional[str]:
     # from dev path to /dev/tty
     console.print()
     console.info("Looking for corresponding serial port")
-    proc = await asyncio.create_subprocess_shell(
-        f"udevadm info --name={dev_path} | grep DEVPATH",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    stdout, _ = await proc.communicate()
-    base_device = stdout.decode().split("=")[1].strip()
-
-    ttys = [x for x in os.listdir("/dev/") if x.startswith("ttyUSB")]
-    for tty in ttys:
-        device_path = f"/dev/{tty}"
-        proc = await asyncio.create_subprocess_shell(
-            f"udevadm info --name={device_path} | grep DEVPATH",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await proc.communicate()
-        device_name = stdout.decode().split("=")[1].strip()
+    base_device = await udev_devpath(dev_path)
+    if base_device is None:
+        console.error(f"Failed to query udev for {dev_path}\n")
+        return None
+
+    ttys = [f"/dev/{x}" for x in os.listdir("/dev/") if x.startswith("ttyUSB")]
+    device_names = await asyncio.gather(*(udev_devpath(x) for x in ttys))
 
-        if device_name.startswith(base_device):
+    for device_path, device_name in zip(ttys, device_names):
+        if device_name is not None and device_name.startswith(base_device):
             console.info(f"Found serial port {device_path} for {dev_path}")
             last_usb = device_path
+            last_usb_model = model
             return device_path
 
     console.error("No serial ports found for that device!\n")
     return None
 
 
-async def run_cc_command(command: str, error_msg: str, last_command: bool = True) -> bool:
+async def udev_devpath(name: str) -> typing.Optional[str]:
+    try:
+        result = await run_process("udevadm", "info", "--query=property", f"--name={name}", timeout=10)
+
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+    for line in result.stdout.decode().splitlines():
+        key, _, value = line.partition("=")
+        if key == "DEVPATH":
+            return value.strip()
+
+    return None
+
+
+async def run_cc_command(
+        command: str,
+        error_msg: str,
+        last_command: bool = True,
+        device: typing.Optional[str] = None,
+) -> bool:
+    start = time.perf_counter()
+    result = "error"
+    logger = SourceLogger(console, device) if device else console
+
     try:
         await loop.run_in_executor(
             executor,
             cc.main,
             command.split(" "),
-            console,
+            logger,
             'cc3200tool.cc3200tool.cc'
         )
 
     except cc.ExitException as e:
         code = e.__str__()
         console.error(f"{error_msg} Errorcode {code}")
+        if device:
+            console.dump_capture(device)
         return False
 
     else:
+        result = "ok"
         return True
 
     finally:
+        Metrics.inc("serial_operations_total", result=result)
+        Metrics.observe("serial_operation_seconds", time.perf_counter() - start)
+
         if last_command:
             console.print(
                 "You can now disconnect your device.\n",
@@ -268,317 +733,1621 @@ async def run_cc_command(command: str, error_msg: str, last_command: bool = True
             )
 
 
-async def dump_certificates(path: str) -> bool:
-    console.print(
-        "\nConnect the Toniebox and press enter to continue...",
-        style="bold steel_blue1",
-        end=" ",
-    )
-    await loop.run_in_executor(executor, input)
-    with console.status(
-            "[bold green4]    Dumping files using modified cc3200tool",
-            spinner="bouncingBar"
-    ):
-        console.info("Creating dump folder")
-        folder = "./certs/box/"
+class SerialTuning:
+    """
+    Picks baud rate and transfer block size for cc3200tool per usb adapter model.
+    Starts at the last known-good setting, steps down on read errors and records the measured throughput.
+    """
+
+    ENABLED = True
+    profiles_path = "./cache/serial_profiles.json"
+    # (baud rate, block size), fastest first
+    candidates = [(921600, 4096), (460800, 2048), (230400, 1024), (115200, 512)]
+    options = ["--baud", "--block-size"]
+    profiles: dict[str, dict] | None = None
+    is_supported: bool | None = None
+
+    @staticmethod
+    def supported() -> bool:
+        """Whether the installed cc3200tool accepts the tuning options, checked once against its argument parser."""
+        if SerialTuning.is_supported is None:
+            parsers = [x for x in vars(cc).values() if isinstance(x, argparse.ArgumentParser)] if cc else []
+            usage = "".join(x.format_help() for x in parsers)
+            SerialTuning.is_supported = bool(usage) and all(
+                re.search(rf"(?<![\w-]){re.escape(x)}\b", usage) for x in SerialTuning.options
+            )
+
+            if not SerialTuning.is_supported:
+                console.debug("cc3200tool does not support baud tuning, using its defaults")
+
+        return SerialTuning.ENABLED and SerialTuning.is_supported
+
+    @staticmethod
+    def load() -> dict[str, dict]:
+        if SerialTuning.profiles is None:
+            SerialTuning.profiles = {}
+            if os.path.exists(SerialTuning.profiles_path):
+                with open(SerialTuning.profiles_path, "r") as f:
+                    SerialTuning.profiles = json.load(f)
+
+        return SerialTuning.profiles
+
+    @staticmethod
+    def save():
+        os.makedirs(os.path.dirname(SerialTuning.profiles_path), exist_ok=True)
+        with open(SerialTuning.profiles_path, "w") as f:
+            json.dump(SerialTuning.profiles, f, indent=2)
+
+    @staticmethod
+    async def run(
+            path: str,
+            operations: str,
+            error_msg: str,
+            transferred: typing.Callable[[], int],
+            model: typing.Optional[str] = None,
+            last_command: bool = True,
+            retry: bool = True,
+    ) -> bool:
+        """
+        Runs `operations` on the device at `path`, tuned for the adapter `model` (default: last selected).
+        Without `retry` the operation runs once with the last known-good setting, use it for writes.
+        """
+        model = model or last_usb_model or "unknown"
+        profile = SerialTuning.load().setdefault(model, {})
+        known = tuple(profile["setting"]) if profile.get("setting") else None
+
+        attempts: list[typing.Optional[tuple[int, int]]] = []
+        if SerialTuning.supported():
+            if retry:
+                attempts = [c for c in SerialTuning.candidates if known is None or c[0] <= known[0]]
+            elif known is not None:
+                attempts = [known]
+
+        if retry or not attempts:
+            # cc3200tool defaults as last resort
+            attempts.append(None)
+
+        try:
+            for setting in attempts:
+                options = f"--baud {setting[0]} --block-size {setting[1]} " if setting else ""
+                command = f"-p {path} --reset dtr {options}{operations}"
+
+                if setting:
+                    console.info(f"Using {setting[0]} baud with {setting[1]} byte blocks")
+
+                start = time.perf_counter()
+                if not await run_cc_command(command, error_msg, last_command=False, device=path):
+                    if setting and retry:
+                        console.warning(f"Failed at {setting[0]} baud, falling back to a slower setting")
+                    continue
+
+                elapsed = time.perf_counter() - start
+                rate = transferred() / max(elapsed, 1e-6)
+                console.info(f"Transferred at {rate:.0f} bytes/s")
+
+                # None records that the defaults of cc3200tool were used
+                profile["setting"] = list(setting) if setting else None
+                profile["bytes_per_second"] = round(rate)
+
+                return True
+
+            return False
+
+        finally:
+            SerialTuning.save()
+            if last_command:
+                console.print(
+                    "You can now disconnect your device.\n",
+                    style="bold steel_blue1",
+                )
+
+
+async def read_box_certificates(
+        path: str,
+        folder: str,
+        model: typing.Optional[str] = None,
+        last_command: bool = True,
+) -> bool:
+    os.makedirs(folder, exist_ok=True)
+
+    # keeps the previous dump if it never made it into the backups
+    await BackupStore.backup_box(folder, only_new=True)
+
+    operations = (
+        f"read_file /cert/ca.der {folder}ca.der "
+        f"read_file /cert/client.der {folder}client.der "
+        f"read_file /cert/private.der {folder}private.der"
+    )
+
+    def dumped_size() -> int:
+        return sum(os.path.getsize(f"{folder}{x}") for x in CertificateStore.box_files)
+
+    return await SerialTuning.run(
+        path, operations, "Failed to read certificates from device.", dumped_size, model, last_command,
+    )
+
+
+async def dump_certificates(path: str) -> bool:
+    console.print(
+        "\nConnect the Toniebox and press enter to continue...",
+        style="bold steel_blue1",
+        end=" ",
+    )
+    await read_input()
+    with console.status(
+            "[bold green4]    Dumping files using modified cc3200tool",
+            spinner="bouncingBar"
+    ), Metrics.phase("dump_certificates"):
+        console.info("Dumping certificates")
+        folder = "./certs/box/"
+
+        if not await read_box_certificates(path, folder):
+            return False
+
+        box_id = await BackupStore.backup_box(folder)
+        console.info(f"Indexed certificates of box {box_id}")
+
+        return True
+
+
+def parse_der_certificate(data: bytes) -> typing.Optional[dict]:
+    """Extracts subject, issuer and validity from a DER encoded X.509 certificate, None if it is not one."""
+    def decode_name(name: x509.Name) -> str:
+        return ", ".join(
+            f"{'emailAddress' if x.oid == NameOID.EMAIL_ADDRESS else x.rfc4514_attribute_name}={x.value}"
+            for x in name
+        )
+
+    try:
+        cert = x509.load_der_x509_certificate(data)
+
+    except ValueError:
+        return None
+
+    # the *_utc properties replaced the naive ones in cryptography 42
+    not_before = getattr(cert, "not_valid_before_utc", None) or cert.not_valid_before.replace(tzinfo=timezone.utc)
+    not_after = getattr(cert, "not_valid_after_utc", None) or cert.not_valid_after.replace(tzinfo=timezone.utc)
+
+    return {
+        "subject": decode_name(cert.subject),
+        "issuer": decode_name(cert.issuer),
+        "not_before": not_before.isoformat(),
+        "not_after": not_after.isoformat(),
+    }
+
+
+class CertificateStore:
+    """
+    Index of the certificates on disk. Files are parsed once, entries are keyed by SHA-256 fingerprint
+    and map box id -> certificates -> servers they were deployed to.
+    """
+
+    index_path = "./certs/index.json"
+    box_files = ["ca.der", "client.der", "private.der"]
+
+    entries: dict[str, dict] = {}
+    paths: dict[str, str] = {}
+    boxes: dict[str, dict[str, str]] = {}
+    deployments: dict[str, list[str]] = {}
+    is_loaded = False
+
+    @staticmethod
+    async def load():
+        if CertificateStore.is_loaded:
+            return
+
+        CertificateStore.is_loaded = True
+        if not os.path.exists(CertificateStore.index_path):
+            return
+
+        async with aiofiles.open(CertificateStore.index_path, "r") as f:
+            index = json.loads(await f.read())
+
+        CertificateStore.entries = index.get("entries", {})
+        CertificateStore.boxes = index.get("boxes", {})
+        CertificateStore.deployments = index.get("deployments", {})
+        CertificateStore.paths = {
+            path: fingerprint
+            for fingerprint, entry in CertificateStore.entries.items()
+            for path in entry["paths"]
+        }
+
+    @staticmethod
+    async def save():
+        os.makedirs(os.path.dirname(CertificateStore.index_path), exist_ok=True)
+        async with aiofiles.open(CertificateStore.index_path, "w") as f:
+            await f.write(json.dumps({
+                "entries": CertificateStore.entries,
+                "boxes": CertificateStore.boxes,
+                "deployments": CertificateStore.deployments,
+            }, indent=2))
+
+    @staticmethod
+    async def add_file(path: str, save: bool = True) -> dict:
+        """Indexes `path`, parsing it only if the file changed since it was indexed last."""
+        await CertificateStore.load()
+
+        path = os.path.normpath(path)
+        stat = os.stat(path)
+
+        fingerprint = CertificateStore.paths.get(path)
+        if fingerprint is not None:
+            entry = CertificateStore.entries[fingerprint]
+            if entry["files"][path] == [stat.st_size, stat.st_mtime]:
+                return entry
+
+            CertificateStore._unlink(path)
+
+        async with aiofiles.open(path, "rb") as f:
+            data = await f.read()
+
+        fingerprint = hashlib.sha256(data).hexdigest()
+        entry = CertificateStore.entries.get(fingerprint)
+        if entry is None:
+            metadata = parse_der_certificate(data)
+            entry = {
+                "fingerprint": fingerprint,
+                "kind": "key" if metadata is None else "certificate",
+                "size": len(data),
+                **(metadata or {}),
+                "paths": [],
+                "files": {},
+            }
+            CertificateStore.entries[fingerprint] = entry
+
+        entry["paths"].append(path)
+        entry["files"][path] = [stat.st_size, stat.st_mtime]
+        CertificateStore.paths[path] = fingerprint
+
+        if save:
+            await CertificateStore.save()
+
+        return entry
+
+    @staticmethod
+    def _unlink(path: str):
+        fingerprint = CertificateStore.paths.pop(path)
+        entry = CertificateStore.entries[fingerprint]
+        entry["paths"].remove(path)
+        del entry["files"][path]
+
+        if not entry["paths"] and not any(fingerprint in c.values() for c in CertificateStore.boxes.values()):
+            del CertificateStore.entries[fingerprint]
+
+    @staticmethod
+    async def add_box_folder(folder: str) -> typing.Optional[str]:
+        """Indexes the dumped certificates of a box, the box id is the common name of its client certificate."""
+        certs = {
+            name: await CertificateStore.add_file(os.path.join(folder, name), save=False)
+            for name in CertificateStore.box_files
+            if os.path.exists(os.path.join(folder, name))
+        }
+
+        box_id = None
+        if client := certs.get("client.der"):
+            subject = dict(x.split("=", 1) for x in client.get("subject", "").split(", ") if "=" in x)
+            box_id = subject.get("CN") or client["fingerprint"][:12]
+
+        if box_id is not None:
+            CertificateStore.boxes[box_id] = {name: entry["fingerprint"] for name, entry in certs.items()}
+
+        await CertificateStore.save()
+        return box_id
+
+    @staticmethod
+    async def record_deployment(box_id: str, server: str):
+        servers = CertificateStore.deployments.setdefault(box_id, [])
+        if server not in servers:
+            servers.append(server)
+            await CertificateStore.save()
+
+    @staticmethod
+    def duplicates() -> list[dict]:
+        return [entry for entry in CertificateStore.entries.values() if len(entry["paths"]) > 1]
+
+
+async def show_certificates():
+    await CertificateStore.load()
+    for folder in ["./certs/box/", "./certs/cloud/"]:
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if name.endswith(".der"):
+                    await CertificateStore.add_file(os.path.join(folder, name), save=False)
+
+    await CertificateStore.save()
+
+    table = Table(title="Certificate inventory")
+    for column in ["Box", "File", "Fingerprint", "Subject", "Valid until", "Servers"]:
+        table.add_column(column)
+
+    for box_id, certs in CertificateStore.boxes.items():
+        servers = ", ".join(CertificateStore.deployments.get(box_id, [])) or "-"
+        for name, fingerprint in certs.items():
+            entry = CertificateStore.entries.get(fingerprint, {})
+            table.add_row(
+                box_id, name, fingerprint[:16], entry.get("subject", "-"), entry.get("not_after", "-"), servers,
+            )
+
+    for entry in CertificateStore.entries.values():
+        if not any(entry["fingerprint"] in c.values() for c in CertificateStore.boxes.values()):
+            table.add_row("-", ", ".join(entry["paths"]), entry["fingerprint"][:16],
+                          entry.get("subject", "-"), entry.get("not_after", "-"), "-")
+
+    console.print(table)
+    for entry in CertificateStore.duplicates():
+        console.warning(f"Identical content in {', '.join(entry['paths'])}")
+
+    manifests, blobs, referenced, stored = BackupStore.usage()
+    if manifests:
+        console.info(
+            f"Backups: {manifests} snapshots, {blobs} blobs, {stored / 1024:.1f} KiB stored "
+            f"for {referenced / 1024:.1f} KiB of dumps"
+        )
+
+    console.print()
+
+
+class BackupStore:
+    """
+    Content addressed history of dumped and fetched files. Every file is stored once as a gzipped blob named
+    by its SHA-256, manifests per owner and timestamp map file names to blobs.
+    """
+
+    folder = "./backups/"
+    chunk_size = 64 * 1024
+
+    @staticmethod
+    def blob_path(digest: str) -> str:
+        return os.path.join(BackupStore.folder, "blobs", digest[:2], f"{digest}.gz")
+
+    @staticmethod
+    def manifest_folder(owner: str) -> str:
+        return os.path.join(BackupStore.folder, "manifests", owner.replace("/", "_"))
+
+    @staticmethod
+    async def put(path: str) -> tuple[str, int, bool]:
+        """Streams `path` into the store, returns its digest, size and whether the blob is new."""
+        temp_path = os.path.join(BackupStore.folder, "blobs", f".{os.getpid()}-{id(path)}.tmp")
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+
+        sha = hashlib.sha256()
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        size = 0
+
+        # hash and compress in one pass, the name of the blob is only known at the end
+        async with aiofiles.open(path, "rb") as src, aiofiles.open(temp_path, "wb") as dst:
+            while chunk := await src.read(BackupStore.chunk_size):
+                sha.update(chunk)
+                size += len(chunk)
+                await dst.write(compressor.compress(chunk))
+
+            await dst.write(compressor.flush())
+
+        digest = sha.hexdigest()
+        blob_path = BackupStore.blob_path(digest)
+        if os.path.exists(blob_path):
+            os.remove(temp_path)
+            return digest, size, False
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(temp_path, blob_path)
+        return digest, size, True
+
+    @staticmethod
+    def manifests(owner: str) -> list[str]:
+        folder = BackupStore.manifest_folder(owner)
+        if not os.path.isdir(folder):
+            return []
+
+        return sorted(os.path.join(folder, x) for x in os.listdir(folder) if x.endswith(".json"))
+
+    @staticmethod
+    async def read_manifest(path: str) -> dict:
+        async with aiofiles.open(path, "r") as f:
+            return json.loads(await f.read())
+
+    @staticmethod
+    async def snapshot(owner: str, files: dict[str, str], only_new: bool = False) -> typing.Optional[str]:
+        """
+        Stores `files` (name -> path) and records a manifest for `owner`. Nothing is recorded if the content
+        matches the latest manifest, or with `only_new` if every blob was already stored.
+        """
+        entries = {}
+        any_new = False
+        for name, path in files.items():
+            if not os.path.exists(path):
+                continue
+
+            digest, size, new = await BackupStore.put(path)
+            entries[name] = {"sha256": digest, "size": size}
+            any_new |= new
+
+        if not entries or (only_new and not any_new):
+            return None
+
+        if latest := BackupStore.manifests(owner):
+            if (await BackupStore.read_manifest(latest[-1]))["files"] == entries:
+                return None
+
+        created = datetime.now(timezone.utc)
+        folder = BackupStore.manifest_folder(owner)
+        os.makedirs(folder, exist_ok=True)
+
+        path = os.path.join(folder, f"{created.strftime('%Y%m%dT%H%M%S%fZ')}.json")
+        async with aiofiles.open(path, "w") as f:
+            await f.write(json.dumps({"owner": owner, "created": created.isoformat(), "files": entries}, indent=2))
+
+        console.debug(f"Recorded backup {path}")
+        return path
+
+    @staticmethod
+    def owners() -> list[str]:
+        root = os.path.join(BackupStore.folder, "manifests")
+        return sorted(os.listdir(root)) if os.path.isdir(root) else []
+
+    @staticmethod
+    async def restore(manifest: str, folder: str):
+        """Writes the files of `manifest` to `folder`, decompressing the blobs chunk-wise."""
+        os.makedirs(folder, exist_ok=True)
+        for name, entry in (await BackupStore.read_manifest(manifest))["files"].items():
+            decompressor = zlib.decompressobj(31)
+            async with aiofiles.open(BackupStore.blob_path(entry["sha256"]), "rb") as src, \
+                    aiofiles.open(os.path.join(folder, name), "wb") as dst:
+                while chunk := await src.read(BackupStore.chunk_size):
+                    await dst.write(decompressor.decompress(chunk))
+
+                await dst.write(decompressor.flush())
+
+    @staticmethod
+    def box_paths(folder: str) -> dict[str, str]:
+        return {name: os.path.join(folder, name) for name in CertificateStore.box_files}
+
+    @staticmethod
+    async def backup_box(folder: str, only_new: bool = False) -> typing.Optional[str]:
+        """Indexes the certificates in `folder` and records them under their box id."""
+        box_id = await CertificateStore.add_box_folder(folder)
+        if box_id is not None:
+            await BackupStore.snapshot(f"box-{box_id}", BackupStore.box_paths(folder), only_new)
+
+        return box_id
+
+    @staticmethod
+    def usage() -> tuple[int, int, int, int]:
+        """Returns the number of manifests, blobs, referenced bytes and stored bytes."""
+        manifests, referenced = 0, 0
+        root = os.path.join(BackupStore.folder, "manifests")
+        for owner in os.listdir(root) if os.path.isdir(root) else []:
+            for name in os.listdir(os.path.join(root, owner)):
+                with open(os.path.join(root, owner, name)) as f:
+                    referenced += sum(x["size"] for x in json.load(f)["files"].values())
+                manifests += 1
+
+        blobs, stored = 0, 0
+        root = os.path.join(BackupStore.folder, "blobs")
+        for prefix in os.listdir(root) if os.path.isdir(root) else []:
+            if os.path.isdir(os.path.join(root, prefix)):
+                for name in os.listdir(os.path.join(root, prefix)):
+                    blobs += 1
+                    stored += os.path.getsize(os.path.join(root, prefix, name))
+
+        return manifests, blobs, referenced, stored
+
+
+async def restore_backup():
+    """Writes a backed up dump or cloud certificate back to `./certs/`, keeping the current files in the store."""
+    owners = BackupStore.owners()
+    if not owners:
+        console.error("No backups found\n")
+        return
+
+    table = Table(title="Backups")
+    for column in ["#", "Owner", "Snapshots", "Latest"]:
+        table.add_column(column)
+
+    for number, owner in enumerate(owners, 1):
+        manifests = BackupStore.manifests(owner)
+        latest = (await BackupStore.read_manifest(manifests[-1]))["created"] if manifests else "-"
+        table.add_row(str(number), owner, str(len(manifests)), latest)
+
+    console.print(table)
+    console.print("[bold]Which backup should be restored?[/bold] (default cancel):", end=" ")
+    try:
+        choice = await read_input()
+        if not choice:
+            return
+
+        owner = owners[int(choice) - 1]
+        manifests = BackupStore.manifests(owner)
+        for number, manifest in enumerate(manifests, 1):
+            created = (await BackupStore.read_manifest(manifest))["created"]
+            console.print(f" [bold]([steel_blue1]{number}[/steel_blue1])[/bold] {created}")
+
+        console.print(f"[bold]Which snapshot?[/bold] (default {len(manifests)}):", end=" ")
+        manifest = manifests[int(await read_input() or len(manifests)) - 1]
+
+    except (ValueError, IndexError):
+        console.error("Invalid number\n")
+        return
+
+    if owner.startswith("cloud"):
+        folder = "./certs/cloud/"
+        await BackupStore.snapshot("cloud", {"ca.der": f"{folder}ca.der"}, only_new=True)
+        await BackupStore.restore(manifest, folder)
+        await CertificateStore.add_file(f"{folder}ca.der")
+
+    else:
+        folder = "./certs/box/"
+        await BackupStore.backup_box(folder, only_new=True)
+        await BackupStore.restore(manifest, folder)
+        await CertificateStore.add_box_folder(folder)
+
+    console.info(f"Restored {owner} to `{folder}`\n")
+
+
+class WebServer:
+    runner: web.AppRunner | None = None
+    server: web.TCPSite | None = None
+    address: tuple[str, int] | None = None
+    is_running: bool = False
+
+    @staticmethod
+    async def download_script(request: web.Request):
+        console.info(f"Request for download from host: {request.headers.get('Host')}")
+
+        async with aiofiles.open("out/client.sh", "r") as f:
+            script = await f.read()
+
+        if os.path.exists(ClientBundle.path):
+            ip_address, port = WebServer.address
+            script = script.replace('PYZ_URL=""', f'PYZ_URL="http://{ip_address}:{port}/client.pyz"', 1)
+
+        headers = {'Content-Disposition': 'attachment; filename="run.sh"'}
+        return web.Response(text=script, headers=headers)
+
+    @staticmethod
+    async def download_bundle(request: web.Request):
+        console.info(f"Request for client bundle from {request.remote}")
+        return web.FileResponse(ClientBundle.path)
+
+    @staticmethod
+    async def download_image(request: web.Request):
+        name = request.match_info["name"]
+        path = os.path.join(ImageCache.folder, name)
+
+        if name != os.path.basename(name) or not os.path.exists(path):
+            raise web.HTTPNotFound()
+
+        console.info(f"Streaming image `{name}` to {request.remote}")
+        response = web.StreamResponse(headers={"Content-Type": "application/gzip"})
+        response.content_length = os.path.getsize(path)
+        await response.prepare(request)
+
+        await ImageCache.stream(path, response.write)
+        await response.write_eof()
+
+        return response
+
+    @staticmethod
+    async def probe(request: web.Request):
+        try:
+            size = min(int(request.query.get("bytes", 0)), LinkProbe.max_bytes)
+
+        except ValueError:
+            raise web.HTTPBadRequest()
+
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        response.content_length = size
+        await response.prepare(request)
+
+        chunk = os.urandom(64 * 1024)
+        while size > 0:
+            await response.write(chunk[:size])
+            size -= len(chunk)
+
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def metrics(_: web.Request):
+        return web.Response(text=Metrics.render(), content_type="text/plain", charset="utf-8")
+
+    @staticmethod
+    async def progress(request: web.Request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        subscriber: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        Metrics.subscribers.add(subscriber)
+
+        try:
+            await response.write(f"data: {json.dumps({'event': 'state', 'phases': Metrics.phases})}\n\n".encode())
+            while (event := await subscriber.get()) is not None:
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+
+        except ConnectionResetError:
+            pass
+
+        finally:
+            Metrics.subscribers.discard(subscriber)
+
+        return response
+
+    @staticmethod
+    async def start_server(announce: bool = True):
+        if WebServer.is_running:
+            if announce:
+                WebServer.announce()
+
+            return
+
+        console.info("Starting file server")
+
+        app = web.Application()
+        app.router.add_get("/install.sh", WebServer.download_script)
+        app.router.add_get("/client.pyz", WebServer.download_bundle)
+        app.router.add_get("/image/{name}", WebServer.download_image)
+        app.router.add_get("/metrics", WebServer.metrics)
+        app.router.add_get("/probe", WebServer.probe)
+        app.router.add_get("/progress", WebServer.progress)
+
+        runner = web.AppRunner(app)
+        WebServer.runner = runner
+
+        await runner.setup()
+
+        # get available random port
+        hostname = socket.gethostname()
+        ip_address = socket.gethostbyname(hostname)
+        with socketserver.TCPServer(("localhost", 0), None) as s:  # noqa
+            _, port = s.server_address
+
+        # port = 56123
+
+        server = web.TCPSite(runner, ip_address, port)
+        WebServer.server = server
+        await server.start()
+
+        WebServer.address = ip_address, port
+        WebServer.is_running = True
+        console.info(f"Metrics on http://{ip_address}:{port}/metrics, progress on http://{ip_address}:{port}/progress")
+
+        if announce:
+            WebServer.announce()
+
+    @staticmethod
+    def announce():
+        ip_address, port = WebServer.address
+        console.log(Panel(
+            "[bold]Copy following command and execute it on your server.[/bold]\n\n"
+            f"\t[bold bright_white]curl -s {ip_address}:{port}/install.sh | bash[/bold bright_white]\n\n"
+            "You might get promoted to enter your admin password to install missing packages or libraries.",
+            expand=False,
+        ))
+
+    @staticmethod
+    async def stop_server():
+        # end open progress streams, the runner waits for running handlers
+        for subscriber in Metrics.subscribers:
+            with contextlib.suppress(asyncio.QueueFull):
+                subscriber.put_nowait(None)
+
+        if server := WebServer.server:
+            await server.stop()
+            WebServer.server = None
+
+        if runner := WebServer.runner:
+            await runner.shutdown()
+            await runner.cleanup()
+            WebServer.runner = None
+
+        WebServer.address = None
+        WebServer.is_running = False
+        console.info("Terminated and cleaned up webserver")
+
+
+class ImageCache:
+    """Local `docker save` tarballs of the TeddyCloud image, one per target platform."""
+
+    folder = "./cache/images/"
+    chunk_size = 256 * 1024
+    platforms = {
+        "x86_64": "linux/amd64",
+        "amd64": "linux/amd64",
+        "aarch64": "linux/arm64",
+        "arm64": "linux/arm64",
+        "armv7l": "linux/arm/v7",
+        "armv6l": "linux/arm/v6",
+        "i686": "linux/386",
+    }
+
+    @staticmethod
+    def platform_for(machine: str) -> typing.Optional[str]:
+        return ImageCache.platforms.get(machine.strip().lower())
+
+    @staticmethod
+    def file_name(platform: str) -> str:
+        return f"teddycloud-{platform.replace('/', '-')}.tar.gz"
+
+    # every platform is pulled to and saved from the same tag
+    lock = asyncio.Lock()
+    refreshed: set[str] = set()
+
+    @staticmethod
+    async def ensure(platform: str, refresh: bool = False) -> typing.Optional[str]:
+        """
+        Returns the cached tarball for `platform`, building it with the local docker if missing.
+        With `refresh` the image is pulled again once per session and the tarball rebuilt if it changed.
+        """
+        # a concurrent pull for another platform would move the tag between this pull and save
+        async with ImageCache.lock:
+            path = os.path.join(ImageCache.folder, ImageCache.file_name(platform))
+            refresh = refresh and platform not in ImageCache.refreshed
+            if os.path.exists(path) and not refresh:
+                console.info(f"Using cached image `{path}`")
+                return path
+
+            if shutil.which("docker") is None:
+                console.debug("No local docker available, cannot stage image")
+                return None
+
+            return await ImageCache.build(platform, path)
+
+    @staticmethod
+    async def build(platform: str, path: str) -> typing.Optional[str]:
+        os.makedirs(ImageCache.folder, exist_ok=True)
+        console.info(f"Pulling image {teddycloud_image} for {platform}")
+
+        id_path = f"{path}.id"
+        tar_path = f"{path}.tar.part"
+        temp_path = f"{path}.part"
+
+        try:
+            for argv in [
+                ["docker", "pull", "--quiet", "--platform", platform, teddycloud_image],
+                ["docker", "image", "inspect", "--format", "{{.Id}}", teddycloud_image],
+            ]:
+                result = await run_process(*argv, timeout=900)
+                if result.returncode != 0:
+                    console.warning(f"Failed to cache image: {result.stderr.decode().strip()}")
+                    return None
+
+            image_id = result.stdout.decode().strip()
+            ImageCache.refreshed.add(platform)
+
+            if os.path.exists(path) and os.path.exists(id_path):
+                async with aiofiles.open(id_path, "r") as f:
+                    if (await f.read()).strip() == image_id:
+                        console.info(f"Cached image `{path}` is up to date")
+                        return path
+
+            console.info(f"Caching image {image_id[:19]} for {platform}")
+            result = await run_process("docker", "save", "-o", tar_path, teddycloud_image, timeout=900)
+            if result.returncode != 0:
+                console.warning(f"Failed to cache image: {result.stderr.decode().strip()}")
+                return None
+
+            await loop.run_in_executor(executor, ImageCache.compress, tar_path, temp_path)
+            os.replace(temp_path, path)
+            async with aiofiles.open(id_path, "w") as f:
+                await f.write(image_id)
+
+        except (OSError, asyncio.TimeoutError) as e:
+            console.warning(f"Failed to cache image: {e}")
+            return None
+
+        finally:
+            for x in [tar_path, temp_path]:
+                if os.path.exists(x):
+                    os.remove(x)
+        console.info(f"Cached image `{path}` ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        return path
+
+    @staticmethod
+    def compress(source: str, target: str):
+        with open(source, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, ImageCache.chunk_size)
+
+    @staticmethod
+    async def stream(path: str, write: typing.Callable[[bytes], typing.Awaitable[None]]) -> int:
+        """Writes the tarball at `path` chunk-wise to `write`, reporting progress and throughput."""
+        total = os.path.getsize(path)
+        sent = 0
+        next_report = 0.1
+        start = time.perf_counter()
+
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(ImageCache.chunk_size):
+                await write(chunk)
+                sent += len(chunk)
+                Metrics.inc("bytes_transferred_total", len(chunk), channel="http", direction="upload")
+
+                if total and sent / total >= next_report:
+                    elapsed = time.perf_counter() - start
+                    Metrics.publish({"event": "progress", "task": "image_transfer", "done": sent, "total": total})
+                    console.progress(
+                        path,
+                        f"Image transfer {sent / total:.0%} "
+                        f"({sent / 1e6:.1f}/{total / 1e6:.1f} MB, {sent / 1e6 / max(elapsed, 1e-6):.1f} MB/s)",
+                        final=sent == total,
+                    )
+                    next_report += 0.1
+
+        elapsed = time.perf_counter() - start
+        console.info(f"Transferred {sent / 1e6:.1f} MB in {elapsed:.1f}s ({sent / 1e6 / max(elapsed, 1e-6):.1f} MB/s)")
+
+        return sent
+
+
+async def get_client_broadcast() -> tuple[str, int]:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+    server_address = ('', broadcast_port)
+    sock.bind(server_address)
+
+    try:
+        with console.status("[bold green4]", spinner="bouncingBar") as status:
+            await asyncio.sleep(1 - (time.time() % 1))
+            console.info("Started client listener")
+            status.update(status="[bold green4]    Waiting for client message...")
+
+            message, _ = await loop.run_in_executor(executor, sock.recvfrom, 4096)
+            body = json.loads(message)
+
+            if body.get("can_accept") is True:
+                data = body["ip"], body["port"]
+                console.info(f"Found ssh client on {data[0]}:{data[1]}")
+
+                if (startup := body.get("startup_seconds")) is not None:
+                    console.info(f"Client took {startup:.1f}s from download to broadcast")
+                    Metrics.observe("client_startup_seconds", startup)
+
+                return data
+
+    finally:
+        sock.close()
+
+
+class RemoteError(Exception):
+    pass
+
+
+class RemoteAgent:
+    """
+    Typed calls to the client agent over a framed channel inside the ssh connection.
+    File and metadata operations are handled by the agent in-process, `exec` runs argv without a shell.
+    """
+
+    def __init__(self, conn: asyncssh.SSHClientConnection):
+        self._conn = conn
+        self._process: asyncssh.SSHClientProcess | None = None
+        self._reader: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+
+    @property
+    def is_open(self) -> bool:
+        return self._reader is not None and not self._reader.done()
+
+    @property
+    def host(self) -> str:
+        return self._conn.get_extra_info("peername")[0]
+
+    async def open(self):
+        self._process = await self._conn.create_process("RPC")
+        self._reader = asyncio.create_task(self._read_responses())
+
+    async def close(self):
+        if self._process is not None:
+            self._process.stdin.write_eof()
+            await self._reader
+            self._process.close()
+            self._process = None
+
+    async def _read_responses(self):
+        try:
+            while True:
+                header = await self._process.stdout.readexactly(8)
+                response = json.loads(await self._process.stdout.readexactly(int(header, 16)))
+
+                future = self._pending.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+
+        except asyncio.IncompleteReadError:
+            pass
+
+        except (asyncssh.Error, OSError) as e:
+            console.debug(f"RPC channel closed: {e}")
+
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(RemoteError("RPC channel closed"))
+
+            self._pending.clear()
+
+    async def call(self, op: str, **args) -> dict:
+        if not self.is_open:
+            raise RemoteError("RPC channel is not open")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        body = json.dumps({"id": request_id, "op": op, "args": args})
+        start = time.perf_counter()
+        self._process.stdin.write(f"{len(body):08x}{body}")
+
+        response = await future
+        Metrics.inc("rpc_calls_total", op=op)
+        Metrics.observe("rpc_call_seconds", time.perf_counter() - start, op=op)
+
+        if not response["ok"]:
+            raise RemoteError(f"`{op}` failed: {response['error']}")
+
+        return response["result"]
+
+    async def read_file(self, path: str) -> bytes:
+        result = await self.call("read_file", path=path)
+        data = base64.b64decode(result["data"])
+        Metrics.inc("bytes_transferred_total", len(data), channel="rpc", direction="download")
+
+        return data
+
+    async def write_file(self, path: str, data: bytes, mode: typing.Optional[int] = None) -> int:
+        result = await self.call("write_file", path=path, data=base64.b64encode(data).decode(), mode=mode)
+        Metrics.inc("bytes_transferred_total", len(data), channel="rpc", direction="upload")
+
+        return result["size"]
+
+    async def remove(self, path: str):
+        await self.call("remove", path=path)
+
+    async def stat(self, path: str) -> dict:
+        return await self.call("stat", path=path)
+
+    async def mkdir(self, path: str, parents: bool = True):
+        await self.call("mkdir", path=path, parents=parents)
+
+    async def chdir(self, path: str, create: bool = False) -> str:
+        result = await self.call("chdir", path=path, create=create)
+        return result["cwd"]
+
+    async def exec(self, *argv: str, stdin: typing.Optional[bytes] = None) -> tuple[int, bytes, bytes]:
+        result = await self.call(
+            "exec",
+            argv=list(argv),
+            stdin=base64.b64encode(stdin).decode() if stdin is not None else None,
+        )
+        code, stdout, stderr = (
+            result["returncode"], base64.b64decode(result["stdout"]), base64.b64decode(result["stderr"])
+        )
+
+        console.capture(self.host, f"$ {' '.join(argv)}")
+        console.capture(self.host, stdout.decode(errors="replace"))
+        if stderr:
+            console.capture(self.host, stderr.decode(errors="replace"))
+        if code != 0:
+            console.capture(self.host, f"exit code {code}")
+
+        return code, stdout, stderr
+
+
+class TelemetryRecorder:
+    """
+    Receives resource samples streamed by the client agent, tags them with the running phases
+    and summarizes them per phase, so slow hardware shows which resource is the bottleneck.
+    """
+
+    interval = 1.0
+    folder = "./out/telemetry/"
+
+    def __init__(self, conn: asyncssh.SSHClientConnection, host: str):
+        self._conn = conn
+        self._host = host
+        self._process: asyncssh.SSHClientProcess | None = None
+        self._reader: asyncio.Task | None = None
+        self.samples: list[dict] = []
+        self.path = f"{TelemetryRecorder.folder}{host}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
+
+    async def start(self):
+        self._process = await self._conn.create_process(f"TELEMETRY {TelemetryRecorder.interval}")
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        os.makedirs(TelemetryRecorder.folder, exist_ok=True)
+
+        async with aiofiles.open(self.path, "w") as f:
+            try:
+                async for line in self._process.stdout:
+                    sample = {**json.loads(line), "phase": Metrics.phases[-1] if Metrics.phases else None}
+                    self.samples.append(sample)
+                    await f.write(json.dumps(sample) + "\n")
+
+                    Metrics.set("target_cpu_percent", sample["cpu"], host=self._host)
+                    Metrics.set("target_iowait_percent", sample["iowait"], host=self._host)
+                    Metrics.set("target_memory_used_megabytes", sample["mem_mb"], host=self._host)
+                    Metrics.set("target_disk_bytes_per_second", sample["disk_r"], host=self._host, direction="read")
+                    Metrics.set("target_disk_bytes_per_second", sample["disk_w"], host=self._host, direction="write")
+                    Metrics.set("target_network_bytes_per_second", sample["net_rx"], host=self._host, direction="rx")
+                    Metrics.set("target_network_bytes_per_second", sample["net_tx"], host=self._host, direction="tx")
+                    Metrics.publish({"event": "telemetry", "host": self._host, **sample})
+
+            except (asyncssh.Error, OSError, ValueError) as e:
+                console.debug(f"Telemetry stream of {self._host} ended: {e}")
+
+    async def stop(self):
+        if self._process is None:
+            return
+
+        self._process.stdin.write_eof()
+        try:
+            await asyncio.wait_for(self._reader, TelemetryRecorder.interval * 3)
+
+        except asyncio.TimeoutError:
+            self._reader.cancel()
+
+        self._process.close()
+        self._process = None
+        self.summarize()
+
+    def summarize(self):
+        if not self.samples:
+            return
+
+        phases: dict[str, list[dict]] = {}
+        for sample in self.samples:
+            phases.setdefault(sample["phase"] or "idle", []).append(sample)
+
+        table = Table(title=f"Resource usage of {self._host} (total memory {self.samples[-1]['mem_total_mb']:.0f} MB)")
+        for column in ["Phase", "Samples", "CPU avg %", "I/O wait max %", "Memory max MB", "Disk MB/s", "Net MB/s"]:
+            table.add_column(column)
+
+        for phase, samples in phases.items():
+            count = len(samples)
+            table.add_row(
+                phase,
+                str(count),
+                f"{sum(x['cpu'] for x in samples) / count:.0f}",
+                f"{max(x['iowait'] for x in samples):.0f}",
+                f"{max(x['mem_mb'] for x in samples):.0f}",
+                f"{sum(x['disk_r'] + x['disk_w'] for x in samples) / count / 1e6:.1f}",
+                f"{sum(x['net_rx'] + x['net_tx'] for x in samples) / count / 1e6:.1f}",
+            )
+
+        console.print(table)
+        console.info(f"Wrote telemetry samples to `{self.path}`")
+
+
+class ConnectionPool:
+    """SSH connections to the discovered client agents, kept alive and reused for the whole session."""
+
+    connections: dict[tuple[str, int], asyncssh.SSHClientConnection] = {}
+    agents: dict[tuple[str, int], RemoteAgent] = {}
+    keepalive_interval = 15
+    keepalive_count_max = 4
+
+    @staticmethod
+    async def get(address: str, port: int) -> asyncssh.SSHClientConnection:
+        key = address, port
+        conn = ConnectionPool.connections.get(key)
+        if conn is not None and not conn.is_closed():
+            return conn
+
+        async with aiofiles.open("certs/ssh/client_key", "r") as file:
+            client_key = await file.read()
+
+        console.debug(f"Opening ssh connection to {address}:{port}")
+        conn = await asyncssh.connect(
+            address,
+            port=port,
+            username='user',
+            client_keys=[asyncssh.import_private_key(client_key)],
+            known_hosts=None,
+            keepalive_interval=ConnectionPool.keepalive_interval,
+            keepalive_count_max=ConnectionPool.keepalive_count_max,
+        )
+        ConnectionPool.connections[key] = conn
+
+        return conn
+
+    @staticmethod
+    async def agent(address: str, port: int) -> RemoteAgent:
+        key = address, port
+        agent = ConnectionPool.agents.get(key)
+        if agent is not None and agent.is_open:
+            return agent
+
+        agent = RemoteAgent(await ConnectionPool.get(address, port))
+        await agent.open()
+        ConnectionPool.agents[key] = agent
+
+        return agent
+
+    @staticmethod
+    def hosts() -> list[tuple[str, int]]:
+        return [k for k, c in ConnectionPool.connections.items() if not c.is_closed()]
+
+    @staticmethod
+    async def close(address: str, port: int, shutdown: bool = True):
+        conn = ConnectionPool.connections.pop((address, port), None)
+        if conn is None:
+            return
+
+        if (agent := ConnectionPool.agents.pop((address, port), None)) and agent.is_open:
+            await agent.close()
+
+        if shutdown and not conn.is_closed():
+            try:
+                # tell the client agent to terminate, otherwise it keeps waiting for connections
+                await conn.run("SHUTDOWN")
+
+            except (OSError, asyncssh.Error) as e:
+                console.debug(f"Failed to shut down client on {address}:{port}: {e}")
+
+        conn.close()
+        await conn.wait_closed()
+        console.info(f"Closed connection to {address}:{port}")
+
+    @staticmethod
+    async def close_all(shutdown: bool = True):
+        await asyncio.gather(*(ConnectionPool.close(*key, shutdown=shutdown) for key in list(ConnectionPool.connections)))
+
+
+async def run_remote(
+        conn: asyncssh.SSHClientConnection,
+        command: str,
+        log: str = None,
+        fail_all: bool = True,
+) -> asyncssh.SSHCompletedProcess:
+    if log:
+        console.info(log)
+
+    start = time.perf_counter()
+    command_result = await conn.run(command)
+    Metrics.inc("ssh_commands_total")
+    Metrics.observe("ssh_command_seconds", time.perf_counter() - start)
+
+    host = conn.get_extra_info("peername")[0]
+    console.capture(host, f"$ {command}")
+    console.capture(host, command_result.stdout or "")
+    if command_result.stderr:
+        console.capture(host, command_result.stderr)
+
+    if command_result.stderr and fail_all:
+        console.error(command_result.stderr)
+        console.dump_capture(host)
+        console.error("Exiting program...")
+        exit(1)
+
+    return command_result
+
+
+async def run_client(address: str, port: int, upload_certs: bool = True):
+    console.info("Running commands for installation")
+
+    with console.status(
+            "[bold green4]    Installing TonieCloud...",
+            spinner="bouncingBar"
+    ) as status:
+        conn = await ConnectionPool.get(address, port)
+        agent = await ConnectionPool.agent(address, port)
+
+        if ConsoleLogger.DEBUG:
+            await benchmark_rpc(conn, agent)
+
+        async def run_command(command: str, log: str = None, fail_all: bool = True) -> asyncssh.SSHCompletedProcess:
+            return await run_remote(conn, command, log=log, fail_all=fail_all)
+
+        console.info("Probing network links")
+        with Metrics.phase("probe_link"):
+            strategy = await LinkProbe.run(agent, address)
+
+        res = await run_command("sudo docker -v", log="Checking docker")
+
+        if "command not found" in res.stdout:
+            if not strategy["internet"]:
+                console.error("Docker is not installed and the server has no internet connection")
+                console.error("Exiting program...")
+                exit(1)
+
+            console.info("Docker not found. Installing...")
+
+            res = await run_command("uname -a")
+            arch = res.stdout.lower()
+            arch = "amd64" if "x86_64" in arch else "i386"
+            console.info(f"Found architecture {arch}")
+
+            commands = [
+                # remove false packages
+                "for pkg in docker.io docker-doc docker-compose podman-docker containerd runc; "
+                "do sudo apt-get remove $pkg; done",
+                # add repo
+                "sudo apt-get update",
+                "sudo apt-get install -y ca-certificates curl",
+                "sudo install -m 0755 -d /etc/apt/keyrings",
+                "sudo curl -fsSL https://download.docker.com/linux/debian/gpg -o /etc/apt/keyrings/docker.asc",
+                "sudo chmod a+r /etc/apt/keyrings/docker.asc",
+                # setup repo
+                fr"""echo \
+                "deb [arch={arch} signed-by=/etc/apt/keyrings/docker.asc] https://download.docker.com/linux/debian \
+                $(. /etc/os-release && echo "$VERSION_CODENAME") stable" | \
+                sudo tee /etc/apt/sources.list.d/docker.list > /dev/null""",
+                "sudo apt-get update",
+                # install docker
+                "sudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin "
+                "docker-compose-plugin",
+            ]
+
+            for c in commands:
+                await run_command(c, log=f"Running `{c}`")
+
+            res = await run_command("sudo docker -v", log="Checking docker")
+            if "command not found" in res.stdout:
+                console.error("Failed to install docker. Please check manually")
+                console.info("Exiting program...")
+                exit(1)
+
+            console.info("Successfully installed docker")
+
+        if strategy["mode"] == "staged":
+            res = await run_command("uname -m")
+            platform = ImageCache.platform_for(res.stdout)
+
+            with Metrics.phase("stage_image"):
+                staged = platform is not None and await stage_image(conn, platform)
+
+            if not staged and not strategy["internet"]:
+                console.error("Failed to stage the image and the server cannot pull it")
+                console.error("Exiting program...")
+                exit(1)
+
+        console.info("Installing TeddyCloud & Web Interface")
+        await agent.chdir("teddy_cloud", create=True)
+        if strategy["internet"]:
+            code, _, stderr = await agent.exec("curl", "-fsS", "-o", "docker-compose.yaml", compose_url)
+            if code != 0:
+                console.error(f"Failed to download docker-compose.yaml: {stderr.decode().strip()}")
+                console.dump_capture(agent.host)
+                console.error("Exiting program...")
+                exit(1)
+
+        else:
+            console.info("Staging docker-compose.yaml from installer host")
+            try:
+                async with aiohttp.ClientSession() as s:
+                    async with s.get(compose_url, raise_for_status=True) as r:
+                        await agent.write_file("docker-compose.yaml", await r.read())
+
+            except aiohttp.ClientError as e:
+                console.error(f"Failed to download docker-compose.yaml: {e}")
+                console.error("Exiting program...")
+                exit(1)
+
+        # enable the port mappings and drop the version line
+        lines = (await agent.read_file("docker-compose.yaml")).decode().split("\n")
+        for number, comment in [(6, "# "), (7, "#"), (8, "#")]:
+            # a shorter upstream file is left as is, like the former sed edits did
+            if number < len(lines):
+                lines[number] = lines[number].replace(comment, "", 1)
+
+        await agent.write_file("docker-compose.yaml", "\n".join(lines[1:]).encode())
+
+        console.info("Starting TeddyCloud")
+        status.update("[bold green4]    Waiting for TeddyCloud to start...[/bold green4]")
+        await run_command("sudo docker compose up -d --quiet-pull")
+
+        with Metrics.phase("wait_ready"):
+            if not await wait_for_cloud(address):
+                console.error("Failed to start cloud within 120 seconds. Please check manually")
+                console.error("Exiting program...")
+                exit(1)
+
+            console.info(
+                f"Cloud is running [bold]on http://{address}/web[/bold]\n"
+                "You can stop it with `sudo docker compose -f teddy_cloud/docker-compose.yaml down`"
+            )
+
+        status.update("[bold green4]    Exchanging certificates...[/bold green4]")
+
+        console.info("Uploading certificate")
+        await run_command("sudo docker cp teddycloud:/teddycloud/certs/server/ca.der ca.der")
+        server_cert = await agent.read_file("ca.der")
+
+        folder = "./certs/cloud/"
         os.makedirs(folder, exist_ok=True)
+        await BackupStore.snapshot("cloud", {"ca.der": f"{folder}ca.der"}, only_new=True)
+        async with aiofiles.open(f"{folder}ca.der", "wb") as file:
+            await file.write(server_cert)
 
-        console.info("Dumping certificates")
-        command = (
-            f"-p {path} "
-            f"--reset dtr "
-            f"read_file /cert/ca.der {folder}ca.der "
-            f"read_file /cert/client.der {folder}client.der "
-            f"read_file /cert/private.der {folder}private.der"
-        )
+        await agent.remove("ca.der")
+        await CertificateStore.add_file(f"{folder}ca.der")
+        await BackupStore.snapshot(f"cloud-{address}", {"ca.der": f"{folder}ca.der"})
 
-        return await run_cc_command(command, "Failed to read certificates from device.")
+        console.info(f"Fetched certificate `{folder}ca.der`")
 
+        if not upload_certs:
+            console.print("Finished installation\n", style="bold steel_blue1")
+            return
 
-class WebServer:
-    runner: web.AppRunner | None = None
-    server: web.TCPSite | None = None
-    is_running: bool = False
+        folder = "./certs/box/"
+        while True:
+            missing: list[str] = []
+            certs: dict[str, bytes] = {}
 
-    @staticmethod
-    async def download_script(request: web.Request):
-        console.info(f"Request for download from host: {request.headers.get('Host')}")
+            for x in ["ca.der", "client.der", "private.der"]:
+                path = f"{folder}{x}"
 
-        path = "out/client.sh"
-        headers = {'Content-Disposition': 'attachment; filename="run.sh"'}
+                if os.path.exists(path):
+                    async with aiofiles.open(path, "rb") as f:
+                        certs[x] = await f.read()
 
-        return web.FileResponse(path, headers=headers)
+                else:
+                    missing.append(x)
 
-    @staticmethod
-    async def start_server():
-        console.info("Starting file server")
+            if not missing:
+                break
 
-        app = web.Application()
-        app.router.add_get("/install.sh", WebServer.download_script)
+            status.stop()
+            console.print(
+                "\n[bold yellow1]Following client certificates are missing:[/bold yellow1]\n" +
+                "\n".join(f"∘︎ {missing}") + "\n" +
+                "Copy missing certificates to `./certs/box/` and press enter.\n"
+                "Type [bold]N[/bold] to finish setup without client certificates",
+                end=" ",
+            )
+            choice = await read_input()
 
-        runner = web.AppRunner(app)
-        WebServer.runner = runner
+            if choice.lower() == "n":
+                console.info("Skipping client certificates")
+                console.print("Finished installation\n", style="bold steel_blue1")
+                return
 
-        await runner.setup()
+            status.start()
 
-        # get available random port
-        hostname = socket.gethostname()
-        ip_address = socket.gethostbyname(hostname)
-        with socketserver.TCPServer(("localhost", 0), None) as s:  # noqa
-            _, port = s.server_address
+        console.info("Loaded all required TonieBox certificates from disk")
+        await transfer_box_certs(agent, certs, folder, address)
 
-        # port = 56123
+        console.print("Finished installation\n", style="bold steel_blue1")
 
-        server = web.TCPSite(runner, ip_address, port)
-        WebServer.server = server
-        await server.start()
 
-        WebServer.is_running = True
+async def wait_for_cloud(address: str, max_tries: int = 60) -> bool:
+    """Polls the web interface until TeddyCloud answers, False if it did not within `max_tries`."""
+    async with aiohttp.ClientSession() as s:
+        while max_tries > 0:
+            console.debug("Trying to connect to cloud")
+            try:
+                async with s.get(f"http://{address}") as r:
+                    text = await r.text()
+                    if "TeddyCloud administration interface" in text:
+                        return True
 
-        console.log(Panel(
-            "[bold]Copy following command and execute it on your server.[/bold]\n\n"
-            f"\t[bold bright_white]curl -s {ip_address}:{port}/install.sh | bash[/bold bright_white]\n\n"
-            "You might get promoted to enter your admin password to install missing packages or libraries.",
-            expand=False,
-        ))
+            except (aiohttp.InvalidURL, aiohttp.ClientConnectionError):
+                pass
 
-    @staticmethod
-    async def stop_server():
-        if server := WebServer.server:
-            await server.stop()
-            WebServer.server = None
+            await asyncio.sleep(3)
+            max_tries -= 1
 
-        if runner := WebServer.runner:
-            await runner.shutdown()
-            await runner.cleanup()
-            WebServer.runner = None
+    return False
 
-        WebServer.is_running = False
-        console.info("Terminated and cleaned up webserver")
 
+async def transfer_box_certs(
+        agent: RemoteAgent,
+        certs: dict[str, bytes],
+        folder: str,
+        server: str,
+        target_dir: str = "/teddycloud/certs/client",
+):
+    if target_dir != "/teddycloud/certs/client":
+        code, _, stderr = await agent.exec("sudo", "docker", "exec", "teddycloud", "mkdir", "-p", target_dir)
+        if code != 0:
+            raise RemoteError(f"Failed to create `{target_dir}` in container: {stderr.decode().strip()}")
 
-async def get_client_broadcast() -> tuple[str, int]:
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    for k, v in certs.items():
+        await agent.write_file(k, v)
+        code, _, stderr = await agent.exec("sudo", "docker", "cp", k, f"teddycloud:{target_dir}/{k}")
+        await agent.remove(k)
 
-    server_address = ('', broadcast_port)
-    sock.bind(server_address)
+        if code != 0:
+            raise RemoteError(f"Failed to copy `{k}` into container: {stderr.decode().strip()}")
 
-    try:
-        with console.status("[bold green4]", spinner="bouncingBar") as status:
-            await asyncio.sleep(1 - (time.time() % 1))
-            console.info("Started client listener")
-            status.update(status="[bold green4]    Waiting for client message...")
+        console.info(f"Transferred certificate `{folder}{k}`")
 
-            message, _ = await loop.run_in_executor(executor, sock.recvfrom, 4096)
-            body = json.loads(message)
+    if box_id := await CertificateStore.add_box_folder(folder):
+        await CertificateStore.record_deployment(box_id, server)
 
-            if body.get("can_accept") is True:
-                data = body["ip"], body["port"]
-                console.info(f"Found ssh client on {data[0]}:{data[1]}")
 
-                return data
+async def benchmark_rpc(conn: asyncssh.SSHClientConnection, agent: RemoteAgent, rounds: int = 20):
+    """Compares per-operation latency of the rpc channel against a shell command on the same connection."""
+    timings: dict[str, list[float]] = {"rpc stat": [], "shell stat": [], "rpc exec": []}
 
-    finally:
-        sock.close()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await agent.stat(".")
+        timings["rpc stat"].append(time.perf_counter() - start)
 
+        start = time.perf_counter()
+        await conn.run("stat .")
+        timings["shell stat"].append(time.perf_counter() - start)
 
-async def run_client(address: str, port: int):
-    console.info("Running commands for installation")
+        start = time.perf_counter()
+        await agent.exec("true")
+        timings["rpc exec"].append(time.perf_counter() - start)
+
+    for name, values in timings.items():
+        values.sort()
+        console.debug(
+            f"{name}: mean {sum(values) / len(values) * 1000:.2f}ms, "
+            f"median {values[len(values) // 2] * 1000:.2f}ms over {rounds} rounds"
+        )
 
-    async with aiofiles.open("certs/ssh/client_key", "r") as file:
-        client_key = await file.read()
 
-    with console.status(
-            "[bold green4]    Installing TonieCloud...",
-            spinner="bouncingBar"
-    ) as status:
-        async with asyncssh.connect(
-                address,
-                port=port,
-                username='user',
-                client_keys=[asyncssh.import_private_key(client_key)],
-                known_hosts=None,
-        ) as conn:
-            async def run_command(command: str, log: str = None, fail_all: bool = True) -> asyncssh.SSHCompletedProcess:
-                if log:
-                    console.info(log)
-
-                command_result = await conn.run(command)
-
-                if command_result.stderr and fail_all:
-                    console.error(command_result.stderr)
-                    console.error("Exiting program...")
-                    exit(1)
-
-                return command_result
-
-            await run_command("ping -c 1 duckduckgo.com", log="Checking internet connection")
-            res = await run_command("sudo docker -v", log="Checking docker")
+async def upload_box_certs():
+    """Re-uploads the box certificates from disk to an already connected server."""
+    hosts = ConnectionPool.hosts()
+    if not hosts:
+        console.error("No connected server in this session. Deploy the cloud first\n")
+        return
 
-            if "command not found" in res.stdout:
-                console.info("Docker not found. Installing...")
-
-                res = await run_command("uname -a")
-                arch = res.stdout.lower()
-                arch = "amd64" if "x86_64" in arch else "i386"
-                console.info(f"Found architecture {arch}")
-
-                commands = [
-                    # remove false packages
-                    "for pkg in docker.io docker-doc docker-compose podman-docker containerd runc; "
-                    "do sudo apt-get remove $pkg; done",
-                    # add repo
-                    "sudo apt-get update",
-                    "sudo apt-get install -y ca-certificates curl",
-                    "sudo install -m 0755 -d /etc/apt/keyrings",
-                    "sudo curl -fsSL https://download.docker.com/linux/debian/gpg -o /etc/apt/keyrings/docker.asc",
-                    "sudo chmod a+r /etc/apt/keyrings/docker.asc",
-                    # setup repo
-                    fr"""echo \
-                    "deb [arch={arch} signed-by=/etc/apt/keyrings/docker.asc] https://download.docker.com/linux/debian \
-                    $(. /etc/os-release && echo "$VERSION_CODENAME") stable" | \
-                    sudo tee /etc/apt/sources.list.d/docker.list > /dev/null""",
-                    "sudo apt-get update",
-                    # install docker
-                    "sudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin "
-                    "docker-compose-plugin",
-                ]
-
-                for c in commands:
-                    await run_command(c, log=f"Running `{c}`")
-
-                res = await run_command("sudo docker -v", log="Checking docker")
-                if "command not found" in res.stdout:
-                    console.error("Failed to install docker. Please check manually")
-                    console.info("Exiting program...")
-                    exit(1)
-
-                console.info("Successfully installed docker")
-
-            console.info("Installing TeddyCloud & Web Interface")
-            await run_command("DIRECTORY INTO teddy_cloud")
-            await run_command("curl -o docker-compose.yaml -s https://raw.githubusercontent.com/"
-                              "toniebox-reverse-engineering/teddycloud/master/docker/docker-compose.yaml")
-
-            await run_command('sed -i "7s/# //" "docker-compose.yaml"')
-            await run_command('sed -i "8s/#//" "docker-compose.yaml"')
-            await run_command('sed -i "9s/#//" "docker-compose.yaml"')
-            await run_command('sed -i "1d" docker-compose.yaml')
-
-            console.info("Starting TeddyCloud")
-            status.update("[bold green4]    Waiting for TeddyCloud to start...[/bold green4]")
-            await run_command("sudo docker compose up -d --quiet-pull")
+    folder = "./certs/box/"
+    certs: dict[str, bytes] = {}
+    for x in ["ca.der", "client.der", "private.der"]:
+        path = f"{folder}{x}"
+        if not os.path.exists(path):
+            console.error(f"Missing certificate `{path}`\n")
+            return
 
-            async with aiohttp.ClientSession() as s:
-                max_tries = 60
-
-                while max_tries > 0:
-                    console.debug("Trying to connect to cloud")
-                    try:
-                        async with s.get(f"http://{address}") as r:
-                            text = await r.text()
-                            if "TeddyCloud administration interface" in text:
-                                console.info(
-                                    f"Cloud is running [bold]on http://{address}/web[/bold]\n"
-                                    "You can stop it with `sudo docker compose -f teddy_cloud/docker-compose.yaml down`"
-                                )
-                                break
-
-                    except (aiohttp.InvalidURL, aiohttp.ClientConnectionError):
-                        await asyncio.sleep(3)
-                        max_tries -= 1
+        async with aiofiles.open(path, "rb") as f:
+            certs[x] = await f.read()
 
-                else:
-                    console.error("Failed to start cloud within 120 seconds. Please check manually")
-                    console.error("Exiting program...")
-                    exit(1)
+    for address, port in hosts:
+        console.info(f"Uploading certificates to {address}")
+        try:
+            agent = await ConnectionPool.agent(address, port)
+            await transfer_box_certs(agent, certs, folder, address)
 
-            status.update("[bold green4]    Exchanging certificates...[/bold green4]")
+        except (OSError, asyncssh.Error, RemoteError) as e:
+            console.error(f"Failed to upload certificates to {address}: {e}")
 
-            console.info("Uploading certificate")
-            await run_command("sudo docker cp teddycloud:/teddycloud/certs/server/ca.der ca.der")
-            result = await run_command("cat ca.der")
+    console.print("Finished uploading certificates\n", style="bold steel_blue1")
 
-            folder = "./certs/cloud/"
-            os.makedirs(folder, exist_ok=True)
-            async with aiofiles.open(f"{folder}ca.der", "wb") as file:
-                server_cert = bytes.fromhex(result.stdout)
-                await file.write(server_cert)
 
-            await run_command(f"rm ca.der")
+class LinkProbe:
+    """
+    Measures internet reachability and bandwidth of the target against the bandwidth between installer and
+    target, then picks whether images are pulled online or staged from the installer host.
+    """
 
-            console.info(f"Fetched certificate `{folder}ca.der`")
+    internet_url = "http://deb.debian.org/debian/ls-lR.gz"
+    probe_bytes = 4 * 1024 * 1024
+    max_bytes = 64 * 1024 * 1024
+    timeout = 10
+    # stage when the lan is at least this much faster than the internet
+    stage_ratio = 2.0
 
-            folder = "./certs/box/"
-            while True:
-                missing: list[str] = []
-                certs: dict[str, str] = {}
+    @staticmethod
+    async def download(agent: RemoteAgent, url: str, ranged: bool) -> tuple[bool, float]:
+        """Downloads `url` on the target, returns whether it responded and the speed in bytes/s."""
+        argv = ["curl", "-s", "-o", "/dev/null", "--max-time", str(LinkProbe.timeout),
+                "-w", "%{http_code} %{speed_download}"]
+        if ranged:
+            argv += ["-r", f"0-{LinkProbe.probe_bytes - 1}"]
 
-                for x in ["ca.der", "client.der", "private.der"]:
-                    path = f"{folder}{x}"
+        code, stdout, _ = await agent.exec(*argv, url)
+        try:
+            status, speed = stdout.decode().split()
 
-                    if os.path.exists(path):
-                        async with aiofiles.open(path, "rb") as f:
-                            content = await f.read()
-                            certs[x] = content.hex()
+        except ValueError:
+            return False, 0.0
 
-                    else:
-                        missing.append(x)
+        # a timeout (28) still measured the speed up to then
+        reachable = code in (0, 28) and status in ("200", "206")
+        return reachable, float(speed) if reachable else 0.0
 
-                if not missing:
-                    break
+    @staticmethod
+    async def run(agent: RemoteAgent, host: str) -> dict:
+        lan_url = None
+        if WebServer.is_running:
+            ip_address, port = WebServer.address
+            lan_url = f"http://{ip_address}:{port}/probe?bytes={LinkProbe.probe_bytes}"
+
+        async def no_lan() -> tuple[bool, float]:
+            return False, 0.0
+
+        (internet, internet_bps), (lan, lan_bps) = await asyncio.gather(
+            LinkProbe.download(agent, LinkProbe.internet_url, ranged=True),
+            LinkProbe.download(agent, lan_url, ranged=False) if lan_url else no_lan(),
+        )
 
-                status.stop()
-                console.print(
-                    "\n[bold yellow1]Following client certificates are missing:[/bold yellow1]\n" +
-                    "\n".join(f"∘︎ {missing}") + "\n" +
-                    "Copy missing certificates to `./certs/box/` and press enter.\n"
-                    "Type [bold]N[/bold] to finish setup without client certificates",
-                    end=" ",
-                )
-                choice = await loop.run_in_executor(executor, input)
+        Metrics.set("link_bytes_per_second", internet_bps, host=host, link="internet")
+        Metrics.set("link_bytes_per_second", lan_bps, host=host, link="lan")
 
-                if choice.lower() == "n":
-                    console.info("Skipping client certificates")
-                    console.print("Finished installation\n", style="bold steel_blue1")
-                    return
+        if not internet:
+            mode, reason = "staged", "no internet connection"
+        elif lan and lan_bps >= LinkProbe.stage_ratio * internet_bps:
+            mode, reason = "staged", f"lan is {lan_bps / max(internet_bps, 1):.1f}x faster"
+        else:
+            mode, reason = "online", "internet is fast enough"
 
-                status.start()
+        console.info(
+            f"Link probe of {host}: internet {'%.1f MB/s' % (internet_bps / 1e6) if internet else 'unreachable'}, "
+            f"lan {'%.1f MB/s' % (lan_bps / 1e6) if lan else 'unavailable'}"
+        )
+        console.info(f"Using {mode} installation ({reason})")
+        Metrics.publish({
+            "event": "strategy", "host": host, "mode": mode,
+            "internet_bps": internet_bps, "lan_bps": lan_bps,
+        })
+
+        return {
+            "mode": mode,
+            "internet": internet,
+            "internet_bps": internet_bps,
+            "lan": lan,
+            "lan_bps": lan_bps,
+        }
+
+
+async def stage_image(conn: asyncssh.SSHClientConnection, platform: str, refresh: bool = False) -> bool:
+    """
+    Loads the cached TeddyCloud image on the target, so `docker compose up` does not pull it.
+    Updates pass `refresh` to stage the current registry image instead of the one cached at install.
+    """
+    path = await ImageCache.ensure(platform, refresh)
+    if path is None:
+        console.info("No staged image available, target will pull from the registry")
+        return False
 
-            console.info("Loaded all required TonieBox certificates from disk")
+    if not WebServer.is_running:
+        await WebServer.start_server(announce=False)
 
-            for k, v in certs.items():
-                await run_command(f"echo {v} | xxd -r -p > {k}")
-                await run_command(f"sudo docker cp {k} teddycloud:/teddycloud/certs/client/{k}")
-                await run_command(f"rm {k}")
+    ip_address, port = WebServer.address
+    url = f"http://{ip_address}:{port}/image/{os.path.basename(path)}"
 
-                console.info(f"Transferred certificate `{folder}{k}`")
+    res = await run_remote(
+        conn,
+        f"curl -sSf {url} | gunzip | sudo docker load",
+        log=f"Staging image from installer host ({platform})",
+        fail_all=False,
+    )
+    if res.stderr or "Loaded image" not in res.stdout:
+        console.warning(f"Failed to stage image, falling back to registry pull: {res.stderr or res.stdout}")
+        return False
 
-            console.print("Finished installation\n", style="bold steel_blue1")
+    console.info("Staged TeddyCloud image on target")
+    return True
 
 
 async def keygen(base_folder: str, name: str):
     task = asyncio.create_task(asyncio.sleep(0.5))
-    proc = await asyncio.create_subprocess_shell(
-        f"ssh-keygen -f {base_folder}{name} -N ''",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    _, stderr = await proc.communicate()
-    assert stderr.decode() == ""
+    result = await run_process("ssh-keygen", "-f", f"{base_folder}{name}", "-N", "")
+    assert result.returncode == 0 and result.stderr.decode() == ""
     await task
 
 
+ssh_keys_generated = False
+
+
 async def generate_certs():
+    global ssh_keys_generated
+
     base_folder = "./certs/ssh/"
-    for x in ["host_key", "host_key.pub", "client_key", "client_key.pub"]:
+    names = ["host_key", "host_key.pub", "client_key", "client_key.pub"]
+    if ssh_keys_generated and all(os.path.exists(f"{base_folder}{x}") for x in names):
+        # keys are generated once per session, pooled connections and running clients trust them
+        console.info("Reusing SSH certificates")
+        return
+
+    for x in names:
         if os.path.exists(f"{base_folder}{x}"):
             os.remove(f"certs/ssh/{x}")
 
     console.info("Generating SSH certificates")
     await keygen(base_folder, "host_key")
     await keygen(base_folder, "client_key")
+    ssh_keys_generated = True
 
 
 async def generate_client():
@@ -616,26 +2385,186 @@ async def generate_client():
     async with aiofiles.open("templates/install.sh", "r") as f:
         script = await f.read()
 
+    wheel = await ClientBundle.fetch()
+
     async with aiofiles.open("out/client.sh", "w") as file:
         script = script.replace(
             "[[script]]",
             template,
             1,
         )
+        # filled in by the webserver, a copied script embeds the client instead
+        script = script.replace("[[pyz_url]]", "", 1)
+        script = script.replace(
+            "[[pyz_cryptography]]", ClientBundle.required_cryptography(wheel) if wheel else "0", 1,
+        )
 
         await file.write(script)
 
-    proc = await asyncio.create_subprocess_shell(
-        "chmod +x out/client.sh",
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    _, stderr = await proc.communicate()
-    assert stderr.decode() == ""
+    os.chmod("out/client.sh", os.stat("out/client.sh").st_mode | 0o111)
+
+    if wheel is not None:
+        await loop.run_in_executor(executor, ClientBundle.build, template, wheel)
+
+    elif os.path.exists(ClientBundle.path):
+        # targets fall back to the embedded client instead of a stale bundle
+        os.remove(ClientBundle.path)
 
     await task
 
 
+class ClientBundle:
+    """
+    Self-contained zipapp of the client agent. asyncssh is vendored from a pinned release the distro packages
+    of the targets can run, other pure python dependencies from the installer host. Compiled ones
+    (cryptography) have to be present on the target.
+    """
+
+    folder = "./cache/bundle/"
+    path = "out/client.pyz"
+    # last release accepting cryptography 38 (Debian bookworm), later ones need 39 and newer
+    asyncssh_url = (
+        "https://files.pythonhosted.org/packages/c8/82/df5365b647cabf9f0f77135b7d7e845c14c6016f8f320b2a172ffe7e9af3/"
+        "asyncssh-2.13.2-py3-none-any.whl"
+    )
+    asyncssh_sha256 = "c7dfe9085c0659acb2ef0d177fb12421e92a20d52b98ab83eed4a5916a1d60cc"
+    vendored = ["typing_extensions"]
+
+    @staticmethod
+    def wheel_path() -> str:
+        return f"{ClientBundle.folder}{os.path.basename(ClientBundle.asyncssh_url)}"
+
+    @staticmethod
+    async def fetch() -> typing.Optional[str]:
+        """Returns the pinned asyncssh wheel, downloading and verifying it on first use."""
+        path = ClientBundle.wheel_path()
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(ClientBundle.folder, exist_ok=True)
+        temp_path = f"{path}.part"
+        sha = hashlib.sha256()
+
+        try:
+            async with aiohttp.ClientSession() as s:
+                async with s.get(ClientBundle.asyncssh_url, raise_for_status=True) as r:
+                    async with aiofiles.open(temp_path, "wb") as f:
+                        async for chunk in r.content.iter_chunked(64 * 1024):
+                            sha.update(chunk)
+                            await f.write(chunk)
+
+            if sha.hexdigest() != ClientBundle.asyncssh_sha256:
+                console.warning("Downloaded asyncssh does not match the pinned hash, not bundling the client")
+                return None
+
+            os.replace(temp_path, path)
+            console.info(f"Cached `{path}`")
+            return path
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            console.warning(f"Failed to download asyncssh for the client bundle: {e}")
+            return None
+
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def required_cryptography(wheel: str) -> str:
+        """Minimum cryptography version the vendored asyncssh declares, checked by the install script."""
+        with zipfile.ZipFile(wheel) as archive:
+            metadata = next(x for x in archive.namelist() if x.endswith(".dist-info/METADATA"))
+            for line in archive.read(metadata).decode().splitlines():
+                if line.startswith("Requires-Dist: cryptography"):
+                    if match := re.search(r">=\s*([\d.]+)", line):
+                        return match.group(1)
+
+        return "0"
+
+    @staticmethod
+    def vendor_files() -> list[tuple[str, str]]:
+        """Returns (file path, archive name) of the vendored modules, skipping packages with compiled parts."""
+        files = []
+        for name in ClientBundle.vendored:
+            spec = importlib.util.find_spec(name)
+            if spec is None or spec.origin is None:
+                console.warning(f"Cannot vendor `{name}`, it is not installed")
+                continue
+
+            if spec.submodule_search_locations is None:
+                files.append((spec.origin, os.path.basename(spec.origin)))
+                continue
+
+            package_dir = list(spec.submodule_search_locations)[0]
+            package_files = []
+            for root, dirs, names in os.walk(package_dir):
+                dirs[:] = [d for d in dirs if d != "__pycache__"]
+                for x in names:
+                    package_files.append(os.path.join(root, x))
+
+            if any(x.endswith((".so", ".pyd")) for x in package_files):
+                console.warning(f"Cannot vendor `{name}`, it contains compiled extensions")
+                continue
+
+            parent = os.path.dirname(package_dir)
+            files.extend(
+                (x, os.path.relpath(x, parent))
+                for x in package_files
+                if x.endswith((".py", ".typed"))
+            )
+
+        return files
+
+    @staticmethod
+    def build_vendor(wheel: str) -> str:
+        versions = [os.path.basename(wheel)]
+        for name in ClientBundle.vendored:
+            try:
+                versions.append(f"{name}=={importlib.metadata.version(name)}")
+            except importlib.metadata.PackageNotFoundError:
+                versions.append(name)
+
+        key = hashlib.sha256(";".join(versions).encode()).hexdigest()[:16]
+        vendor_path = f"{ClientBundle.folder}vendor-{key}.zip"
+        if os.path.exists(vendor_path):
+            return vendor_path
+
+        os.makedirs(ClientBundle.folder, exist_ok=True)
+        temp_path = f"{vendor_path}.part"
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            with zipfile.ZipFile(wheel) as source:
+                for item in source.infolist():
+                    if ".dist-info/" not in item.filename:
+                        archive.writestr(item.filename, source.read(item))
+
+            for file_path, name in ClientBundle.vendor_files():
+                archive.write(file_path, name)
+
+        os.replace(temp_path, vendor_path)
+        console.info(f"Cached vendored dependencies {', '.join(versions)}")
+
+        return vendor_path
+
+    @staticmethod
+    def build(script: str, wheel: str) -> str:
+        vendor_path = ClientBundle.build_vendor(wheel)
+
+        temp_path = f"{ClientBundle.path}.part"
+        with open(temp_path, "wb") as f:
+            f.write(b"#!/usr/bin/env python3\n")
+
+            with zipfile.ZipFile(vendor_path, "r") as vendor, zipfile.ZipFile(f, "a", zipfile.ZIP_DEFLATED) as archive:
+                for item in vendor.infolist():
+                    archive.writestr(item, vendor.read(item))
+
+                archive.writestr("__main__.py", script)
+
+        os.replace(temp_path, ClientBundle.path)
+        os.chmod(ClientBundle.path, 0o755)
+
+        return ClientBundle.path
+
+
 async def generate_scripts():
     # generate certificates
     with console.status(
@@ -650,18 +2579,168 @@ async def generate_scripts():
         await generate_client()
 
 
-async def run_cloud_install():
+async def run_cloud_install(upload_certs: bool = True) -> typing.Optional[tuple[str, int]]:
     # wait for the client to connect
     client_addr = await get_client_broadcast()
 
-    if WebServer.is_running is True:
-        await WebServer.stop_server()
-
+    telemetry = None
     try:
-        await run_client(*client_addr)
+        telemetry = TelemetryRecorder(await ConnectionPool.get(*client_addr), client_addr[0])
+        await telemetry.start()
+
+        with Metrics.phase("deploy_cloud"):
+            await run_client(*client_addr, upload_certs=upload_certs)
 
-    except (OSError, asyncssh.Error) as exc:
+    except (OSError, asyncssh.Error, RemoteError) as exc:
         console.error('Error connecting to server: ' + str(exc))
+        return None
+
+    finally:
+        if telemetry is not None:
+            await telemetry.stop()
+
+    if upload_certs:
+        console.print(
+            "[bold]Run a load benchmark against the cloud? [[green4]y[/green4]/[red3]N[/red3]] [/bold]",
+            end=""
+        )
+        if (await read_input()).lower() == "y":
+            await CloudBenchmark.run(client_addr[0])
+
+    return client_addr
+
+
+class CloudBenchmark:
+    """Concurrent request mixes against a deployed TeddyCloud, results are kept per host for comparison."""
+
+    results_path = "./out/benchmarks.json"
+    concurrency = 8
+    requests = 200
+    timeout = 10
+    # (path, weight)
+    request_mix = [("/", 2), ("/web/", 2), ("/api/stats", 1)]
+
+    @staticmethod
+    def percentile(values: list[float], q: float) -> float:
+        """Nearest-rank percentile of sorted `values`."""
+        if not values:
+            return 0.0
+
+        return values[min(len(values) - 1, max(0, int(q * len(values) + 0.5) - 1))]
+
+    @staticmethod
+    async def measure(
+            base_url: str,
+            concurrency: int,
+            requests: int,
+            request_mix: list[tuple[str, int]],
+    ) -> dict:
+        paths = [path for path, weight in request_mix for _ in range(weight)]
+        latencies: dict[str, list[float]] = {path: [] for path, _ in request_mix}
+        errors = 0
+        issued = itertools.count()
+
+        async def worker(session: aiohttp.ClientSession):
+            nonlocal errors
+            while (i := next(issued)) < requests:
+                path = paths[i % len(paths)]
+                start = time.perf_counter()
+
+                try:
+                    async with session.get(f"{base_url}{path}") as r:
+                        await r.read()
+                        if r.status >= 400:
+                            errors += 1
+                            continue
+
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                    continue
+
+                latencies[path].append(time.perf_counter() - start)
+
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        timeout = aiohttp.ClientTimeout(total=CloudBenchmark.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        combined = sorted(x for values in latencies.values() for x in values)
+
+        def summary(values: list[float]) -> dict:
+            values = sorted(values)
+            return {
+                "count": len(values),
+                "p50_ms": round(CloudBenchmark.percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(CloudBenchmark.percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(CloudBenchmark.percentile(values, 0.99) * 1000, 2),
+            }
+
+        return {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "concurrency": concurrency,
+            "requests": requests,
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(combined) / max(elapsed, 1e-6), 2),
+            **summary(combined),
+            "paths": {path: summary(values) for path, values in latencies.items()},
+        }
+
+    @staticmethod
+    async def run(
+            host: str,
+            base_url: typing.Optional[str] = None,
+            concurrency: typing.Optional[int] = None,
+            requests: typing.Optional[int] = None,
+            request_mix: typing.Optional[list[tuple[str, int]]] = None,
+    ) -> dict:
+        base_url = base_url or f"http://{host}"
+        concurrency = concurrency or CloudBenchmark.concurrency
+        requests = requests or CloudBenchmark.requests
+
+        with console.status(
+                f"[bold green4]    Benchmarking {base_url} with {concurrency} concurrent clients...",
+                spinner="bouncingBar"
+        ), Metrics.phase("benchmark"):
+            result = await CloudBenchmark.measure(
+                base_url, concurrency, requests, request_mix or CloudBenchmark.request_mix,
+            )
+
+        history: dict[str, list[dict]] = {}
+        if os.path.exists(CloudBenchmark.results_path):
+            async with aiofiles.open(CloudBenchmark.results_path, "r") as f:
+                history = json.loads(await f.read())
+
+        previous = history.get(host, [])
+        history[host] = [*previous, result]
+
+        os.makedirs(os.path.dirname(CloudBenchmark.results_path), exist_ok=True)
+        async with aiofiles.open(CloudBenchmark.results_path, "w") as f:
+            await f.write(json.dumps(history, indent=2))
+
+        table = Table(title=f"Benchmark of {host}")
+        for column in ["Path", "Requests", "p50 ms", "p95 ms", "p99 ms"]:
+            table.add_column(column)
+
+        for path, values in result["paths"].items():
+            table.add_row(path, str(values["count"]), *(str(values[x]) for x in ["p50_ms", "p95_ms", "p99_ms"]))
+
+        table.add_row("all", str(result["count"]), *(str(result[x]) for x in ["p50_ms", "p95_ms", "p99_ms"]))
+        console.print(table)
+
+        console.info(
+            f"{result['requests_per_second']} requests/s, {result['errors']} errors in {result['seconds']}s"
+        )
+        if previous:
+            last = previous[-1]
+            console.info(
+                f"Previous run: {last['requests_per_second']} requests/s, p95 {last['p95_ms']}ms"
+            )
+
+        console.print()
+        return result
 
 
 async def flash_cloud_cert(path: str):
@@ -672,12 +2751,12 @@ async def flash_cloud_cert(path: str):
         "Type [bold]i understand[/bold] to continue:",
         end=" ",
     )
-    choice = await loop.run_in_executor(executor, input)
+    choice = await read_input()
     if choice.lower() != "i understand":
         console.error("Aborting operation\n")
         return
 
-    cert_path = "./certs/cloud/ca.der"
+    cert_path = "certs/cloud/ca.der"
     if not os.path.exists(cert_path):
         console.error("No cloud certificate found. Place one at `./certs/cloud/ca.der`")
         return
@@ -689,18 +2768,416 @@ async def flash_cloud_cert(path: str):
         style="bold steel_blue1",
         end=" ",
     )
-    await loop.run_in_executor(executor, input)
+    await read_input()
     with console.status(
             "[bold green4]    Flashing cloud certificate using modified cc3200tool",
             spinner="bouncingBar"
-    ):
-        command = (
-            f"-p {path} "
-            f"--reset dtr "
-            f"write_file certs/cloud/ca.der /certs/server/ca.der"
+    ), Metrics.phase("flash_cloud_cert"):
+        return await write_cloud_certificate(path, cert_path)
+
+
+async def write_cloud_certificate(
+        path: str,
+        cert_path: str,
+        model: typing.Optional[str] = None,
+        last_command: bool = True,
+) -> bool:
+    return await SerialTuning.run(
+        path,
+        f"write_file {cert_path} /certs/server/ca.der",
+        "Failed to flash certificate to device.",
+        lambda: os.path.getsize(cert_path),
+        model,
+        last_command,
+        retry=False,
+    )
+
+
+class ProvisioningPipeline:
+    """
+    Provisions several boxes with overlapping stages: dump -> upload to the server and flash the cloud CA.
+    A box keeps its adapter from dump until it is flashed, other adapters can dump the next boxes meanwhile.
+    Stages are connected by bounded queues and report their utilization at the end.
+    """
+
+    queue_size = 2
+
+    def __init__(self, adapters: list[tuple[str, typing.Optional[str]]], server: tuple[str, int], count: int):
+        self.adapters: asyncio.Queue = asyncio.Queue()
+        for adapter in adapters:
+            self.adapters.put_nowait(adapter)
+
+        self.workers = len(adapters)
+        self.server = server
+        self.count = count
+        self.boxes = iter(range(1, count + 1))
+        self.uploads: asyncio.Queue = asyncio.Queue(maxsize=ProvisioningPipeline.queue_size)
+        self.flashes: asyncio.Queue = asyncio.Queue(maxsize=max(self.workers, ProvisioningPipeline.queue_size))
+        self.prompt_lock = asyncio.Lock()
+        self.busy: dict[str, float] = {"dump": 0.0, "upload": 0.0, "flash": 0.0}
+        self.waiting: dict[str, float] = {"dump": 0.0, "upload": 0.0, "flash": 0.0}
+        self.done: dict[str, int] = {"dump": 0, "upload": 0, "flash": 0}
+        self.failed: list[str] = []
+        self.unflashed: set[int] = set()
+        self.serial_operations: set[asyncio.Task] = set()
+
+    def serial(self, operation: typing.Awaitable[bool]) -> asyncio.Task:
+        """
+        Runs a cc3200tool operation as its own task. Cancelling a stage does not stop cc3200tool in the executor,
+        stages await it shielded and the pipeline waits for it before reporting.
+        """
+        task = asyncio.ensure_future(operation)
+        self.serial_operations.add(task)
+        task.add_done_callback(self.serial_operations.discard)
+        return task
+
+    async def confirm(self, message: str):
+        # stages share the terminal, only one prompt at a time
+        async with self.prompt_lock:
+            await enter_to_continue(message)
+
+    async def dump_stage(self):
+        for number in self.boxes:
+            start = time.perf_counter()
+            port, model = await self.adapters.get()
+            handed_over = False
+
+            try:
+                await self.confirm(f"\nConnect box {number} to `{port}` and press enter...")
+                self.waiting["dump"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                folder = f"./certs/boxes/{number}/"
+                with Metrics.phase("pipeline_dump"):
+                    success = await asyncio.shield(
+                        self.serial(read_box_certificates(port, folder, model, last_command=False))
+                    )
+
+                if not success:
+                    self.failed.append(f"box {number}: dump")
+                    self.busy["dump"] += time.perf_counter() - start
+                    continue
+
+                box_id = await BackupStore.backup_box(folder) or str(number)
+                console.info(f"Dumped box {number} ({box_id})")
+                self.busy["dump"] += time.perf_counter() - start
+                self.done["dump"] += 1
+
+                start = time.perf_counter()
+                # the box keeps its adapter until it is flashed
+                self.unflashed.add(number)
+                await self.flashes.put((number, box_id, port, model))
+                handed_over = True
+                await self.uploads.put((number, box_id, folder))
+                self.waiting["dump"] += time.perf_counter() - start
+
+            finally:
+                if not handed_over:
+                    self.adapters.put_nowait((port, model))
+
+    async def upload_stage(self):
+        agent = None
+
+        while True:
+            start = time.perf_counter()
+            item = await self.uploads.get()
+            self.waiting["upload"] += time.perf_counter() - start
+            if item is None:
+                return
+
+            number, box_id, folder = item
+            start = time.perf_counter()
+
+            try:
+                if agent is None or not agent.is_open:
+                    agent = await ConnectionPool.agent(*self.server)
+
+                certs = {}
+                for name in CertificateStore.box_files:
+                    async with aiofiles.open(f"{folder}{name}", "rb") as f:
+                        certs[name] = await f.read()
+
+                target = "".join(c for c in box_id if c.isalnum())
+                with Metrics.phase("pipeline_upload"):
+                    await transfer_box_certs(
+                        agent, certs, folder, self.server[0], f"/teddycloud/certs/client/{target}",
+                    )
+                self.done["upload"] += 1
+
+            except (OSError, asyncssh.Error, RemoteError) as e:
+                # keeps draining the queue, so the dump stage is never blocked by a broken server
+                console.error(f"Failed to upload certificates of box {number}: {e}")
+                self.failed.append(f"box {number}: upload")
+
+            finally:
+                self.busy["upload"] += time.perf_counter() - start
+
+    def flashed(self, operation: asyncio.Task, number: int, box_id: str, port: str, model: typing.Optional[str],
+                start: float):
+        # runs when cc3200tool returned, also if the flash stage was cancelled meanwhile
+        self.busy["flash"] += time.perf_counter() - start
+        self.unflashed.discard(number)
+
+        if not operation.cancelled() and operation.exception() is None and operation.result():
+            self.done["flash"] += 1
+            console.info(f"Flashed box {number} ({box_id}), it can be disconnected from `{port}`")
+
+        else:
+            self.failed.append(f"box {number}: flash")
+
+        self.adapters.put_nowait((port, model))
+
+    async def flash_stage(self):
+        while True:
+            start = time.perf_counter()
+            item = await self.flashes.get()
+            self.waiting["flash"] += time.perf_counter() - start
+            if item is None:
+                return
+
+            number, box_id, port, model = item
+            start = time.perf_counter()
+
+            with Metrics.phase("pipeline_flash"):
+                operation = self.serial(write_cloud_certificate(port, "certs/cloud/ca.der", model, last_command=False))
+                operation.add_done_callback(lambda x, box=item, begin=start: self.flashed(x, *box, begin))
+                await asyncio.shield(operation)
+
+    async def run(self):
+        start = time.perf_counter()
+
+        uploader = asyncio.create_task(self.upload_stage())
+        flashers = [asyncio.create_task(self.flash_stage()) for _ in range(self.workers)]
+        dumpers = [asyncio.create_task(self.dump_stage()) for _ in range(self.workers)]
+
+        async def close_queues():
+            await asyncio.gather(*dumpers)
+            await self.uploads.put(None)
+            for _ in flashers:
+                await self.flashes.put(None)
+
+        tasks = [uploader, *flashers, *dumpers, asyncio.create_task(close_queues())]
+        try:
+            # a stage that dies would leave the others waiting on its queue forever
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if task.exception() is not None:
+                        raise task.exception()
+
+        except Exception as e:
+            console.error(f"Stopped pipeline after an unexpected error: {e!r}")
+
+        finally:
+            # no new boxes are started, serial operations that already run are finished
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            if self.serial_operations:
+                console.info(f"Waiting for {len(self.serial_operations)} running serial operations")
+                await asyncio.gather(*self.serial_operations, return_exceptions=True)
+
+        for number in sorted(self.unflashed):
+            self.failed.append(f"box {number}: not flashed, the pipeline stopped")
+
+        self.report(time.perf_counter() - start)
+
+    def report(self, wall: float):
+        workers = {"dump": self.workers, "upload": 1, "flash": self.workers}
+
+        table = Table(title=f"Provisioned {self.done['flash']}/{self.count} boxes in {wall:.0f}s")
+        for column in ["Stage", "Workers", "Done", "Busy s", "Waiting s", "Utilization"]:
+            table.add_column(column)
+
+        for stage, busy in self.busy.items():
+            utilization = busy / max(wall * workers[stage], 1e-6)
+            table.add_row(
+                stage, str(workers[stage]), str(self.done[stage]),
+                f"{busy:.1f}", f"{self.waiting[stage]:.1f}", f"{utilization:.0%}",
+            )
+
+        console.print(table)
+
+        bottleneck = max(self.busy, key=lambda x: self.busy[x] / workers[x])
+        console.info(f"Stage limiting throughput: {bottleneck}")
+        for failure in self.failed:
+            console.error(f"Failed {failure}")
+
+
+async def run_pipeline():
+    console.print("\nStarting pipelined installation", style="bold steel_blue1")
+    console.print("[bold]How many boxes should be provisioned?[/bold] (default 1):", end=" ")
+    try:
+        count = int(await read_input() or 1)
+
+    except ValueError:
+        console.error("Invalid number\n")
+        return
+
+    adapters: list[tuple[str, typing.Optional[str]]] = []
+    while True:
+        usb_port = await get_usb_port()
+        if usb_port is not None and usb_port not in [x[0] for x in adapters]:
+            adapters.append((usb_port, last_usb_model))
+
+        console.print(
+            "[bold]Add another uart adapter? [[green4]y[/green4]/[red3]N[/red3]] [/bold]",
+            end=""
+        )
+        if (await read_input()).lower() != "y":
+            break
+
+    if not adapters:
+        console.error("No uart adapter selected\n")
+        return
+
+    console.print(
+        "\n[bold red3]WARNING: THIS WILL OVERWRITE THE EXISTING CLOUD CERTIFICATE OF EVERY BOX!\n"
+        "THE ORIGINAL IS DUMPED FIRST, KEEP THE DUMPS SAFE![/bold red3]\n"
+        "Type [bold]i understand[/bold] to continue:",
+        end=" ",
+    )
+    if (await read_input()).lower() != "i understand":
+        console.error("Aborting operation\n")
+        return
+
+    # the cloud ca has to exist before the first box is flashed
+    console.print("\nStarting cloud installation", style="bold steel_blue1")
+    await generate_scripts()
+    await WebServer.start_server()
+    server = await run_cloud_install(upload_certs=False)
+    if server is None:
+        return
+
+    await ProvisioningPipeline(adapters, server, count).run()
+    console.print()
+
+
+class RollingUpdate:
+    """
+    Updates TeddyCloud on deployed servers in waves. The new image is pulled while the old container keeps
+    serving, then swapped and gated on the readiness check. A failing host halts the remaining waves.
+    """
+
+    parallelism = 1
+
+    @staticmethod
+    async def container_image(agent: RemoteAgent) -> typing.Optional[str]:
+        code, stdout, _ = await agent.exec("sudo", "docker", "inspect", "--format", "{{.Image}}", "teddycloud")
+        return stdout.decode().strip() if code == 0 else None
+
+    @staticmethod
+    async def update_host(address: str, port: int) -> bool:
+        try:
+            conn = await ConnectionPool.get(address, port)
+            agent = await ConnectionPool.agent(address, port)
+
+            # the agent stays in teddy_cloud when it installed the cloud in this session
+            try:
+                await agent.stat("docker-compose.yaml")
+
+            except RemoteError:
+                await agent.chdir("teddy_cloud")
+
+            before = await RollingUpdate.container_image(agent)
+
+            with Metrics.phase("update_pull"):
+                strategy = await LinkProbe.run(agent, address)
+                res = await run_remote(conn, "uname -m")
+                platform = ImageCache.platform_for(res.stdout)
+
+                staged = (
+                        strategy["mode"] == "staged"
+                        and platform is not None
+                        and await stage_image(conn, platform, refresh=True)
+                )
+                if not staged:
+                    console.info(f"Pulling new image on {address}")
+                    code, _, stderr = await agent.exec("sudo", "docker", "compose", "pull", "--quiet")
+                    if code != 0:
+                        console.error(f"Failed to pull image on {address}: {stderr.decode().strip()}")
+                        return False
+
+            with Metrics.phase("update_swap"):
+                console.info(f"Swapping container on {address}")
+                code, _, stderr = await agent.exec("sudo", "docker", "compose", "up", "-d", "--quiet-pull")
+                if code != 0:
+                    console.error(f"Failed to restart TeddyCloud on {address}: {stderr.decode().strip()}")
+                    return False
+
+            with Metrics.phase("update_ready"):
+                if not await wait_for_cloud(address):
+                    console.error(f"TeddyCloud on {address} did not become ready")
+                    return False
+
+            after = await RollingUpdate.container_image(agent)
+            if before == after:
+                console.info(f"TeddyCloud on {address} was already up to date")
+            else:
+                console.info(f"Updated TeddyCloud on {address} to image {(after or '?')[:19]}")
+
+            return True
+
+        except (OSError, asyncssh.Error, RemoteError) as e:
+            console.error(f"Failed to update {address}: {e}")
+            return False
+
+    @staticmethod
+    async def run(hosts: list[tuple[str, int]], parallelism: int) -> bool:
+        waves = [hosts[i:i + parallelism] for i in range(0, len(hosts), parallelism)]
+
+        with console.status("[bold green4]    Updating TeddyCloud...", spinner="bouncingBar") as status:
+            for number, wave in enumerate(waves, 1):
+                status.update(f"[bold green4]    Updating wave {number}/{len(waves)}...")
+                console.info(f"Wave {number}/{len(waves)}: {', '.join(x[0] for x in wave)}")
+
+                with Metrics.phase("update_wave"):
+                    results = await asyncio.gather(*(RollingUpdate.update_host(*host) for host in wave))
+
+                if not all(results):
+                    failed = [host[0] for host, ok in zip(wave, results) if not ok]
+                    remaining = [host[0] for w in waves[number:] for host in w]
+                    console.error(f"Halting rolling update, failed on {', '.join(failed)}")
+                    if remaining:
+                        console.error(f"Not updated: {', '.join(remaining)}")
+
+                    return False
+
+        console.print(f"Updated {len(hosts)} servers\n", style="bold steel_blue1")
+        return True
+
+
+async def run_update():
+    console.print("\nStarting rolling update", style="bold steel_blue1")
+    hosts = ConnectionPool.hosts()
+    if hosts:
+        console.info(f"Connected servers: {', '.join(x[0] for x in hosts)}")
+
+    console.print(f"[bold]How many servers should be updated?[/bold] (default {len(hosts) or 1}):", end=" ")
+    try:
+        count = int(await read_input() or len(hosts) or 1)
+        console.print(
+            f"[bold]How many servers at once?[/bold] (default {RollingUpdate.parallelism}):", end=" "
         )
+        parallelism = max(1, int(await read_input() or RollingUpdate.parallelism))
+
+    except ValueError:
+        console.error("Invalid number\n")
+        return
+
+    if len(hosts) < count:
+        # the remaining servers have to run the client script first
+        await generate_scripts()
+        await WebServer.start_server()
 
-        return await run_cc_command(command, "Failed to flash certificate to device.")
+        while len(hosts) < count:
+            client_addr = await get_client_broadcast()
+            if client_addr not in hosts:
+                hosts.append(client_addr)
+
+    await RollingUpdate.run(hosts[:count], parallelism)
 
 
 async def check_cc_prompt() -> bool:
@@ -711,17 +3188,26 @@ async def check_cc_prompt() -> bool:
             "[bold]Do you want to download it? [[green4]y[/green4]/[red3]N[/red3]] [/bold]",
             end=""
         )
-        choice = await loop.run_in_executor(None, input)
+        choice = await read_input()
         if choice.lower() == "y":
             with console.status(
                     "[bold green4]    Installing cc3200tool...",
                     spinner="bouncingBar"
             ):
                 console.info("Downloading Biscgit/cc3200tool")
-                proc = await asyncio.create_subprocess_shell(
-                    "git clone --quiet https://github.com/Biscgit/cc3200tool.git",
-                )
-                await proc.wait()
+                try:
+                    result = await run_process(
+                        "git", "clone", "--quiet", "https://github.com/Biscgit/cc3200tool.git",
+                        timeout=300,
+                    )
+
+                except (OSError, asyncio.TimeoutError) as e:
+                    console.error(f"Failed to download cc3200tool: {str(e) or 'timed out'}\n")
+                    return False
+
+                if result.returncode != 0:
+                    console.error(f"Failed to download cc3200tool: {result.stderr.decode().strip()}\n")
+                    return False
 
                 console.info("Installed cc3200tool module")
 
@@ -736,16 +3222,19 @@ async def check_cc_prompt() -> bool:
 
 
 async def enter_to_continue(message: str = "press enter to continue..."):
+    console.flush()
     console.print(
         message,
         style="bold steel_blue1",
         end=" ",
     )
-    await loop.run_in_executor(executor, input)
+    await read_input()
 
 
 async def main():
     print_welcome()
+    # serves the install script, staged images, metrics and progress for the whole session
+    await WebServer.start_server(announce=False)
 
     # ask which mode user wants
     await print_description()
@@ -784,6 +3273,23 @@ async def main():
 
                 await flash_cloud_cert(usb_port)
 
+        elif option == "6":
+            await upload_box_certs()
+
+        elif option == "7":
+            await show_certificates()
+
+        elif option == "8":
+            if not ConnectionPool.hosts():
+                console.error("No connected server in this session. Deploy the cloud first\n")
+                continue
+
+            for address, _ in ConnectionPool.hosts():
+                await CloudBenchmark.run(address)
+
+        elif option == "9":
+            await restore_backup()
+
         elif option in ["f", "full", "a", "all"]:
             console.print("\nStarting full installation", style="bold steel_blue1")
 
@@ -815,10 +3321,19 @@ async def main():
 
                 console.print("\nAll done!", style="bold steel_blue1")
                 await enter_to_continue("press enter to exit...")
+                await ConnectionPool.close_all()
                 exit(0)
 
+        elif option in ["u", "update"]:
+            await run_update()
+
+        elif option in ["p", "pipeline"]:
+            if await check_cc_prompt():
+                await run_pipeline()
+
         elif option in ["q", "exit", "quit", "stop"]:
             console.info("Exiting...")
+            await ConnectionPool.close_all()
             exit(0)
 
         else:
@@ -837,7 +3352,14 @@ if __name__ == '__main__':
         loop.stop()
 
     finally:
+        if ConnectionPool.connections:
+            loop.run_until_complete(ConnectionPool.close_all())
+
+        if WebServer.is_running:
+            loop.run_until_complete(WebServer.stop_server())
+
         loop.close()
 
     console.log("Program finished")
+    console.close()
     exit(0)
@@ -1,10 +1,12 @@
 import asyncio
+import base64
 import json
 import logging
 import os
 import pathlib
 import socket
 import socketserver
+import time
 import typing
 
 import asyncssh
@@ -30,11 +32,18 @@ class BroadCaster:
         ssh_port = SSHServer.ssh_port
 
         broadcast_address = ('<broadcast>', broadcast_port)
-        broadcast_message = json.dumps({
+        message = {
             "can_accept": True,
             "ip": local_ip,
             "port": ssh_port
-        })
+        }
+
+        # set by the install script, lets the installer measure the bootstrap time. Only sent with the first
+        # broadcast, later ones after a reconnect would report the time since the script started
+        if started := os.environ.pop("AUTOINSTALL_START", None):
+            message["startup_seconds"] = round(time.time() - float(started), 3)
+
+        broadcast_message = json.dumps(message)
 
         try:
             running_time = 0
@@ -56,25 +65,250 @@ class BroadCaster:
         self._has_connected = True
 
 
+class RPCHandler:
+    """
+    Typed calls over a multiplexed channel, answered in-process without spawning a shell.
+    Frames are an 8 digit hex length followed by an ascii json body, binary data is base64 encoded.
+    """
+
+    @staticmethod
+    def resolve(path: str) -> pathlib.Path:
+        return SSHServer.current_folder / path
+
+    @staticmethod
+    async def read_file(path: str) -> dict:
+        return {"data": base64.b64encode(RPCHandler.resolve(path).read_bytes()).decode()}
+
+    @staticmethod
+    async def write_file(path: str, data: str, mode: typing.Optional[int] = None) -> dict:
+        target = RPCHandler.resolve(path)
+        content = base64.b64decode(data)
+        target.write_bytes(content)
+
+        if mode is not None:
+            target.chmod(mode)
+
+        return {"size": len(content)}
+
+    @staticmethod
+    async def remove(path: str) -> dict:
+        RPCHandler.resolve(path).unlink()
+        return {}
+
+    @staticmethod
+    async def stat(path: str) -> dict:
+        result = RPCHandler.resolve(path).stat()
+        return {
+            "size": result.st_size,
+            "mode": result.st_mode,
+            "mtime": result.st_mtime,
+            "is_dir": os.path.isdir(RPCHandler.resolve(path)),
+        }
+
+    @staticmethod
+    async def mkdir(path: str, parents: bool = True) -> dict:
+        RPCHandler.resolve(path).mkdir(parents=parents, exist_ok=True)
+        return {}
+
+    @staticmethod
+    async def chdir(path: str, create: bool = False) -> dict:
+        target = RPCHandler.resolve(path).resolve()
+        if create:
+            target.mkdir(parents=True, exist_ok=True)
+
+        os.chdir(target)
+        SSHServer.current_folder = target
+
+        return {"cwd": str(target)}
+
+    @staticmethod
+    async def exec(argv: list[str], stdin: typing.Optional[str] = None) -> dict:
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate(base64.b64decode(stdin) if stdin is not None else None)
+        logger.info(f"Exec: `{' '.join(argv)}` returned {proc.returncode}")
+
+        return {
+            "returncode": proc.returncode,
+            "stdout": base64.b64encode(stdout).decode(),
+            "stderr": base64.b64encode(stderr).decode(),
+        }
+
+    @staticmethod
+    def send(process: asyncssh.SSHServerProcess, message: dict) -> None:
+        body = json.dumps(message)
+        process.stdout.write(f"{len(body):08x}{body}")
+
+    @staticmethod
+    async def dispatch(process: asyncssh.SSHServerProcess, request: dict) -> None:
+        operations = {
+            "read_file": RPCHandler.read_file,
+            "write_file": RPCHandler.write_file,
+            "remove": RPCHandler.remove,
+            "stat": RPCHandler.stat,
+            "mkdir": RPCHandler.mkdir,
+            "chdir": RPCHandler.chdir,
+            "exec": RPCHandler.exec,
+        }
+
+        try:
+            operation = operations[request["op"]]
+            result = await operation(**request.get("args", {}))
+            RPCHandler.send(process, {"id": request["id"], "ok": True, "result": result})
+
+        except Exception as e:
+            logger.warning(f"RPC `{request.get('op')}` failed: {type(e).__name__} {e}")
+            RPCHandler.send(process, {"id": request.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    @staticmethod
+    async def serve(process: asyncssh.SSHServerProcess) -> None:
+        logger.info("Opened rpc channel")
+        tasks: set[asyncio.Task] = set()
+
+        try:
+            while True:
+                header = await process.stdin.readexactly(8)
+                body = await process.stdin.readexactly(int(header, 16))
+
+                task = asyncio.create_task(RPCHandler.dispatch(process, json.loads(body)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        except asyncio.IncompleteReadError:
+            pass
+
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            logger.info("Closed rpc channel")
+
+
+class Telemetry:
+    """Samples cpu, memory, disk and network counters from /proc and streams them as json lines."""
+
+    @staticmethod
+    def read_counters() -> dict:
+        with open("/proc/stat") as f:
+            cpu = [int(x) for x in f.readline().split()[1:]]
+
+        memory = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                memory[key] = int(value.split()[0])
+
+        # whole disks only, partitions are part of their disk
+        disks = {x for x in os.listdir("/sys/block") if not x.startswith(("loop", "ram", "zram"))}
+        disk_read = disk_written = 0
+        with open("/proc/diskstats") as f:
+            for line in f:
+                fields = line.split()
+                if fields[2] in disks:
+                    disk_read += int(fields[5]) * 512
+                    disk_written += int(fields[9]) * 512
+
+        net_rx = net_tx = 0
+        with open("/proc/net/dev") as f:
+            for line in f.readlines()[2:]:
+                name, values = line.split(":", 1)
+                if name.strip() == "lo":
+                    continue
+
+                values = values.split()
+                net_rx += int(values[0])
+                net_tx += int(values[8])
+
+        return {
+            "time": time.time(),
+            "cpu_total": sum(cpu),
+            "cpu_idle": cpu[3] + (cpu[4] if len(cpu) > 4 else 0),
+            "cpu_iowait": cpu[4] if len(cpu) > 4 else 0,
+            "mem_total": memory.get("MemTotal", 0),
+            "mem_available": memory.get("MemAvailable", memory.get("MemFree", 0)),
+            "disk_read": disk_read,
+            "disk_written": disk_written,
+            "net_rx": net_rx,
+            "net_tx": net_tx,
+        }
+
+    @staticmethod
+    def sample(previous: dict, current: dict) -> dict:
+        elapsed = max(current["time"] - previous["time"], 1e-6)
+        cpu_total = max(current["cpu_total"] - previous["cpu_total"], 1)
+
+        return {
+            "t": round(current["time"], 3),
+            "cpu": round(100 * (1 - (current["cpu_idle"] - previous["cpu_idle"]) / cpu_total), 1),
+            "iowait": round(100 * (current["cpu_iowait"] - previous["cpu_iowait"]) / cpu_total, 1),
+            "mem_mb": round((current["mem_total"] - current["mem_available"]) / 1024, 1),
+            "mem_total_mb": round(current["mem_total"] / 1024, 1),
+            "disk_r": round((current["disk_read"] - previous["disk_read"]) / elapsed),
+            "disk_w": round((current["disk_written"] - previous["disk_written"]) / elapsed),
+            "net_rx": round((current["net_rx"] - previous["net_rx"]) / elapsed),
+            "net_tx": round((current["net_tx"] - previous["net_tx"]) / elapsed),
+        }
+
+    @staticmethod
+    async def stream(process: asyncssh.SSHServerProcess, interval: float) -> None:
+        logger.info(f"Streaming telemetry every {interval}s")
+        # the installer closes stdin to stop the stream
+        eof = asyncio.create_task(process.stdin.read())
+        previous = Telemetry.read_counters()
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({eof}, timeout=interval)
+                if done:
+                    break
+
+                current = Telemetry.read_counters()
+                process.stdout.write(json.dumps(Telemetry.sample(previous, current)) + "\n")
+                previous = current
+
+        finally:
+            eof.cancel()
+            logger.info("Stopped telemetry")
+
+
 class SSHServer(asyncssh.SSHServer):
     broadcast = BroadCaster()
     task: typing.Optional[asyncio.Task] = None
     ssh_port: typing.Optional[int] = None
     current_folder = pathlib.Path.cwd()
+    connections = 0
+    is_shutting_down = False
+
+    def __init__(self):
+        self._authenticated = False
 
     def auth_completed(self) -> None:
         # only activate on successful authentication -> for example, avoid close on nmap scanning
+        self._authenticated = True
+        SSHServer.connections += 1
         SSHServer.broadcast.set_connected()
 
     def connection_made(self, conn: asyncssh.SSHServerConnection) -> None:
         logging.info(f"Connection from {conn.get_extra_info('peername')[0]}")
 
     def connection_lost(self, exc: typing.Optional[Exception]) -> None:
-        # on disconnect the script should have finished, stopping server
-        loop.stop()
         if exc:
             logger.error(f"Closing connection with exception: {exc}")
 
+        if not self._authenticated:
+            return
+
+        # the server keeps running until the installer sends SHUTDOWN, announce it again for reconnects
+        SSHServer.connections -= 1
+        if SSHServer.connections == 0 and not SSHServer.is_shutting_down and SSHServer.task is None:
+            logger.info("Installer disconnected, waiting for a new connection")
+            SSHServer.broadcast = BroadCaster()
+            SSHServer.task = asyncio.create_task(SSHServer.broadcast.cast_script_up())
+
     @staticmethod
     def change_location(command: str) -> None:
         split = command.strip("DIRECTORY").strip(" ").lower().split(" ")
@@ -102,6 +336,22 @@ class SSHServer(asyncssh.SSHServer):
             SSHServer.task = None
 
         try:
+            if process.command == "SHUTDOWN":
+                logger.info("Received shutdown from installer")
+                SSHServer.is_shutting_down = True
+                process.stdout.write("Shutting down")
+                loop.call_later(0.5, loop.stop)
+                return
+
+            if process.command == "RPC":
+                await RPCHandler.serve(process)
+                return
+
+            if process.command.startswith("TELEMETRY"):
+                _, _, interval = process.command.partition(" ")
+                await Telemetry.stream(process, float(interval or 1))
+                return
+
             if process.command.startswith("DIRECTORY"):
                 try:
                     SSHServer.change_location(process.command)
@@ -125,9 +375,11 @@ class SSHServer(asyncssh.SSHServer):
             if stdout:
                 try:
                     out = stdout.decode().rstrip('\n')
-                    logger.info(f"Command: `{process.command}` with stdout: {out}")
+                    first_line = out.split('\n', 1)[0][:120]
+                    logger.info(f"Command: `{process.command}` with {len(stdout)} bytes stdout: {first_line}")
                 except UnicodeDecodeError:
                     out = stdout.hex()
+                    logger.info(f"Command: `{process.command}` with {len(stdout)} bytes binary stdout")
 
                 process.stdout.write(out)
 
@@ -1,5 +1,9 @@
 #!/bin/bash
 
+# lets the client report how long the bootstrap took
+AUTOINSTALL_START=$(date +%s.%N)
+export AUTOINSTALL_START
+
 echo "Checking for required packages"
 
 # python
@@ -33,15 +37,29 @@ else
   echo "+ OK python "
 fi
 
-# rust
-if ! command -v rustc &>/dev/null; then
-  echo "- rust"
-  sudo apt-get install -y rustc
+# set by the installer's webserver, empty when the script was copied manually
+PYZ_URL="[[pyz_url]]"
+# the bundle vendors asyncssh, only cryptography has to come from the system in the version asyncssh requires
+PYZ_CRYPTOGRAPHY="[[pyz_cryptography]]"
 
-  echo "+ installed rust"
+cryptography_ok() {
+  python3 -c 'import re, sys, cryptography
+version = lambda x: [int(n) for n in re.findall(r"\d+", x)[:3]]
+sys.exit(version(cryptography.__version__) < version(sys.argv[1]))' "$PYZ_CRYPTOGRAPHY" &>/dev/null
+}
 
-else
-  echo "+ OK rust"
+if [ -n "$PYZ_URL" ] && cryptography_ok && curl -fsS -o client.pyz "$PYZ_URL"; then
+  echo "Running bundled client"
+  if python3 client.pyz; then
+    echo "Cleaning up"
+    rm -f client.pyz
+
+    echo "All done!"
+    exit 0
+  fi
+
+  echo "Bundled client failed, falling back to the system packages"
+  rm -f client.pyz
 fi
 
 # not required -> only one package needed -> pip ssl error
@@ -0,0 +1,53 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import autoinstaller
+
+
+async def handle_ok(_: web.Request) -> web.Response:
+    return web.Response(text="TeddyCloud administration interface")
+
+
+def fake_cloud() -> web.Application:
+    # no /api/stats, like TeddyCloud versions without the endpoint
+    app = web.Application()
+    app.router.add_get("/", handle_ok)
+    app.router.add_get("/web/", handle_ok)
+    return app
+
+
+def measure(request_mix: list[tuple[str, int]], requests: int) -> dict:
+    async def run() -> dict:
+        async with TestServer(fake_cloud()) as server:
+            base_url = str(server.make_url("")).rstrip("/")
+            return await autoinstaller.CloudBenchmark.measure(base_url, 4, requests, request_mix)
+
+    return asyncio.run(run())
+
+
+def test_counts_latencies_per_path():
+    result = measure([("/", 1), ("/web/", 1)], 40)
+
+    assert result["errors"] == 0
+    assert result["count"] == 40
+    assert result["paths"]["/"]["count"] == 20
+    assert result["paths"]["/web/"]["count"] == 20
+    assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+
+def test_client_errors_are_not_latency_samples():
+    result = measure([("/", 2), ("/web/", 2), ("/api/stats", 1)], 50)
+
+    assert result["errors"] == 10
+    assert result["count"] == 40
+    assert result["paths"]["/api/stats"]["count"] == 0
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(x) for x in range(1, 101)]
+
+    assert autoinstaller.CloudBenchmark.percentile(values, 0.50) == 50.0
+    assert autoinstaller.CloudBenchmark.percentile(values, 0.99) == 99.0
+    assert autoinstaller.CloudBenchmark.percentile([], 0.95) == 0.0
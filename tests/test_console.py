@@ -0,0 +1,64 @@
+import os
+import pty
+import select
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import autoinstaller
+
+console = autoinstaller.console
+for i in range(20):
+    with console.status("working"):
+        console.info(f"logged inside status {i}")
+    console.print(f"printed after status {i}")
+console.print("finished")
+"""
+
+
+def run_in_terminal(script: str, timeout: float = 30) -> str:
+    """Runs `script` on a pseudo terminal and returns its output, rich only renders a Live display there."""
+    master, slave = pty.openpty()
+    process = subprocess.Popen(
+        [sys.executable, "-c", script],
+        stdin=slave, stdout=slave, stderr=slave, cwd=ROOT,
+        env={**os.environ, "TERM": "xterm-256color", "COLUMNS": "120"},
+    )
+    os.close(slave)
+
+    output = b""
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline:
+            if select.select([master], [], [], 0.1)[0]:
+                try:
+                    chunk = os.read(master, 65536)
+                except OSError:
+                    break
+
+                if not chunk:
+                    break
+                output += chunk
+
+            elif process.poll() is not None:
+                break
+
+        else:
+            raise AssertionError(f"Script did not finish within {timeout}s:\n{output.decode(errors='replace')}")
+
+    finally:
+        process.kill()
+        process.wait()
+        os.close(master)
+
+    return output.decode(errors="replace")
+
+
+def test_log_inside_status_does_not_deadlock():
+    output = run_in_terminal(SCRIPT)
+
+    assert "finished" in output
+    assert output.count("logged inside status") == 20